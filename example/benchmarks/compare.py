@@ -0,0 +1,66 @@
+"""
+Compares two result files of 'benchmarks.run' by the median duration of each
+scenario and function. It exits with status 1, if one of them got slower than
+the threshold, such that it can be used in a CI job.
+
+Usage (in the folder 'example'):
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    """
+    Loads the results of a benchmark run
+
+    :param path: str: path of the json file
+    :return: tuple: meta information and dict (scenario, function) -> result
+    """
+    with open(path) as result_file:
+        report = json.load(result_file)
+    return report["meta"], {(result["scenario"], result["function"]): result
+                            for result in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline", help="result file of the reference run")
+    parser.add_argument("candidate", help="result file to compare")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown counted as regression")
+    args = parser.parse_args(argv)
+
+    baseline_meta, baseline = load(args.baseline)
+    candidate_meta, candidate = load(args.candidate)
+    if baseline_meta["books"] != candidate_meta["books"]:
+        sys.stdout.write("warning: the runs used %d and %d books\n"
+                         % (baseline_meta["books"], candidate_meta["books"]))
+
+    regressions = 0
+    for key in sorted(set(baseline) & set(candidate)):
+        before = baseline[key]["median_ms"]
+        after = candidate[key]["median_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "improved"
+        queries = ""
+        if baseline[key]["queries"] != candidate[key]["queries"]:
+            queries = "queries %.1f -> %.1f" % (baseline[key]["queries"],
+                                                candidate[key]["queries"])
+        sys.stdout.write("%-24s %-18s %10.3f -> %10.3f ms %+7.1f%% %s %s\n"
+                         % (key + (before, after, change * 100, flag,
+                                   queries)))
+    for key in sorted(set(baseline) ^ set(candidate)):
+        sys.stdout.write("%-24s %-18s only in one run\n" % key)
+    sys.stdout.write("%d regression(s)\n" % regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Fills the benchmark database with synthetic authors and books, from 10k up to
+10M books. The data is generated from a seed, so the same arguments always
+produce the same database.
+
+Usage (in the folder 'example'):
+    python -m benchmarks.generate --books 100000
+"""
+from __future__ import unicode_literals
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django_countries import countries
+from example.models import Author, Book
+
+
+WORDS = ["red", "blue", "green", "silent", "lost", "golden", "hidden", "last",
+         "dark", "bright", "river", "mountain", "city", "garden", "winter",
+         "summer", "shadow", "light", "stone", "ocean", "forest", "dream",
+         "night", "storm"]
+"""vocabulary of the generated names, such that the searches find records"""
+
+BATCH_SIZE = 10000
+
+FIRST_DATE = date(2000, 1, 1)
+
+
+def generate_authors(count, rng):
+    """
+    Generates the rows of the author table
+
+    :param count: int: number of authors
+    :param rng: Random: random number generator
+    :return: generator of tuple: name and nationality
+    """
+    codes = [code for code, _ in countries]
+    for i in range(count):
+        yield ("%s %s %d" % (rng.choice(WORDS).capitalize(),
+                             rng.choice(WORDS).capitalize(), i),
+               rng.choice(codes))
+
+
+def generate_books(count, author_ids, description_size, rng):
+    """
+    Generates the rows of the book table
+
+    :param count: int: number of books
+    :param author_ids: list of int: primary keys of the authors
+    :param description_size: int: length of the description
+    :param rng: Random: random number generator
+    :return: generator of tuple: name, description, author and publish date
+    """
+    description = "x" * description_size
+    for i in range(count):
+        yield ("%s %s %d" % (rng.choice(WORDS), rng.choice(WORDS), i),
+               description, rng.choice(author_ids),
+               FIRST_DATE + timedelta(days=rng.randrange(7300)))
+
+
+def insert(table, columns, rows):
+    """
+    Inserts the rows batch by batch with executemany
+
+    :param table: str: name of the table
+    :param columns: list of str: names of the columns
+    :param rows: iterable of tuple: rows to insert
+    :return: int: number of inserted rows
+    """
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        connection.ops.quote_name(table),
+        ", ".join(connection.ops.quote_name(column) for column in columns),
+        ", ".join(["%s"] * len(columns)))
+    total, batch = 0, []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            total += len(batch)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=10000,
+                        help="number of books, 10000 to 10000000")
+    parser.add_argument("--books-per-author", type=int, default=100)
+    parser.add_argument("--description-size", type=int, default=200,
+                        help="length of the book descriptions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if not 10000 <= args.books <= 10000000:
+        parser.error("--books must be between 10000 and 10000000.")
+
+    call_command("migrate", verbosity=0)
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        # the database is thrown away after the benchmark anyway
+        cursor.execute("PRAGMA journal_mode = OFF")
+        cursor.execute("PRAGMA synchronous = OFF")
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for model in (Book, Author):
+                cursor.execute("DELETE FROM %s" % connection.ops.quote_name(
+                    model._meta.db_table))
+        insert(Author._meta.db_table, ["name", "nationality"],
+               generate_authors(max(args.books // args.books_per_author, 1),
+                                rng))
+        author_ids = list(Author.objects.values_list("pk", flat=True))
+        count = insert(Book._meta.db_table,
+                       ["name", "description", "author_id", "published_at"],
+                       generate_books(args.books, author_ids,
+                                      args.description_size, rng))
+    with connection.cursor() as cursor:
+        # statistics for the estimated count strategy
+        cursor.execute("ANALYZE")
+    sys.stdout.write("%d authors and %d books generated in %.1f s into %s\n"
+                     % (len(author_ids), count, time.perf_counter() - start,
+                        connection.settings_dict["NAME"]))
+
+
+if __name__ == "__main__":
+    main()
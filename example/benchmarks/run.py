@@ -0,0 +1,240 @@
+"""
+Measures the request path of BookDataTables on the benchmark database and
+writes the results as json, which can be compared with 'benchmarks.compare'.
+Each scenario changes one dimension of the baseline request (page size,
+offset, search pattern or ordering), each function of the request path is
+measured in each scenario.
+
+Usage (in the folder 'example'):
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --meta projection=true --output after.json
+"""
+from __future__ import unicode_literals
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from example.datatables import BookDataTables
+from example.models import Author, Book
+from sspdatatables.datatables import DataTables
+from sspdatatables.utils.decorator import dt_json_response
+
+
+FUNCTIONS = ["get_query_dict", "get_order_key", "query_by_args", "process",
+             "dt_json_response"]
+
+
+def make_datatables(meta_options):
+    """
+    Creates a DataTables class with the Meta class of BookDataTables and the
+    given options, e.g. to compare the pagination modes
+
+    :param meta_options: dict: variables of the Meta class to override
+    :return: DataTables instance
+    """
+    meta = {name: value for name, value in vars(BookDataTables.Meta).items()
+            if not name.startswith("__")}
+    meta.update({"timing": False, "response_cache_timeout": None})
+    meta.update(meta_options)
+    meta_class = type("Meta", (), meta)
+    return type("BenchmarkDataTables", (DataTables,), {"Meta": meta_class})()
+
+
+def build_request(length=10, start=0, order=(1, "asc"), columns=None,
+                  search=""):
+    """
+    Builds the parameters, which data tables package sends for the table of
+    the example
+
+    :param length: int: page size
+    :param start: int: position of the first record
+    :param order: tuple: number of the column and direction
+    :param columns: None/dict: number of the column -> search value
+    :param search: str: value of the global search
+    :return: QueryDict
+    """
+    frame = BookDataTables.Meta.frame
+    query = QueryDict(mutable=True)
+    query.update({"draw": "1", "start": str(start), "length": str(length),
+                  "total_cols": str(len(frame)),
+                  "order[0][column]": str(order[0]),
+                  "order[0][dir]": order[1],
+                  "search[value]": search, "search[regex]": "false"})
+    for i, item in enumerate(frame):
+        prefix = "columns[%d]" % i
+        query.update({
+            prefix + "[data]": str(i),
+            prefix + "[searchable]": "true" if item["searchable"] else "false",
+            prefix + "[orderable]": "true" if item["orderable"] else "false",
+            prefix + "[search][value]": (columns or {}).get(i, ""),
+            prefix + "[search][regex]": "false",
+        })
+    return query
+
+
+def scenarios(books):
+    """
+    Generates the scenarios: the baseline request and one dimension changed
+    at a time
+
+    :param books: int: number of books in the database
+    :return: generator of tuple: name, parameters of 'build_request'
+    """
+    yield "baseline", {}
+    for length in (100, 500):
+        yield "length_%d" % length, {"length": length}
+    for name, start in (("middle", books // 2), ("end", max(books - 10, 0))):
+        yield "offset_" + name, {"start": start}
+    yield "search_name", {"columns": {2: "river"}}
+    yield "search_author", {"columns": {3: "Stone"}}
+    yield "search_nationality", {"columns": {4: "DE"}}
+    yield "search_id_range", {"columns": {1: "%d..%d" % (books // 3,
+                                                          books // 3 + 1000)}}
+    yield "search_date_range", {"columns": {5: "2010-01-01..2010-12-31"}}
+    yield "search_global", {"search": "golden river"}
+    yield "order_name_desc", {"order": (2, "desc")}
+    yield "order_author", {"order": (3, "asc")}
+    yield "order_date_desc_offset", {"order": (5, "desc"),
+                                     "start": books // 2}
+
+
+def measure(func, repeat):
+    """
+    Calls the function repeatedly and measures each call
+
+    :param func: function without arguments
+    :param repeat: int: number of measured calls
+    :return: dict: statistics in milliseconds and the number of SQL queries
+      per call
+    """
+    func()  # warm up
+    durations = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                durations.append((time.perf_counter() - start) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "min_ms": min(durations),
+        "median_ms": statistics.median(durations),
+        "mean_ms": statistics.mean(durations),
+        "max_ms": max(durations),
+        "repeat": repeat,
+        "queries": len(queries) / repeat,
+    }
+
+
+def run_scenario(datatables, query, repeat):
+    """
+    Measures the functions of the request path for one request
+
+    :param datatables: DataTables instance
+    :param query: QueryDict: parameters of the request
+    :param repeat: int: number of measured calls per function
+    :return: dict: function name -> statistics
+    """
+    result = datatables.process(dt_request=query)
+
+    def query_by_args():
+        records = datatables.query_by_args(dt_request=query)
+        # the page is fetched lazily by the offset pagination
+        list(records["items"])
+
+    functions = {
+        "get_query_dict": lambda: datatables.get_query_dict(query),
+        "get_order_key": lambda: datatables.get_order_key(query),
+        "query_by_args": query_by_args,
+        "process": lambda: datatables.process(dt_request=query),
+        "dt_json_response": lambda: dt_json_response(result),
+    }
+    return {name: measure(functions[name], repeat) for name in FUNCTIONS}
+
+
+def parse_meta_options(options):
+    """
+    Parses the options given as 'name=value', the value is read as json if
+    possible, e.g. 'projection=true' or 'pagination=keyset'
+
+    :param options: list of str
+    :return: dict
+    """
+    meta_options = {}
+    for option in options:
+        name, _, value = option.partition("=")
+        try:
+            meta_options[name] = json.loads(value)
+        except ValueError:
+            meta_options[name] = value
+    return meta_options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmark.json",
+                        help="path of the json file with the results")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="number of measured calls per function")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="only run the given scenario(s)")
+    parser.add_argument("--meta", action="append", default=[],
+                        help="override a Meta variable, e.g. "
+                             "'pagination=keyset'")
+    args = parser.parse_args(argv)
+
+    books, authors = Book.objects.count(), Author.objects.count()
+    if not books:
+        parser.error("The benchmark database is empty, run "
+                     "'python -m benchmarks.generate' first.")
+    meta_options = parse_meta_options(args.meta)
+    datatables = make_datatables(meta_options)
+    results = []
+    for name, params in scenarios(books):
+        if args.scenario and name not in args.scenario:
+            continue
+        measured = run_scenario(datatables, build_request(**params),
+                                args.repeat)
+        for function, statistic in measured.items():
+            results.append(dict(statistic, scenario=name, function=function))
+            sys.stdout.write("%-24s %-18s %10.3f ms %5.1f queries\n" % (
+                name, function, statistic["median_ms"], statistic["queries"]))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "books": books,
+            "authors": authors,
+            "meta_options": meta_options,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    sys.stdout.write("results written into %s\n" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Django settings for the benchmarks: the settings of the example project with
+a separate SQLite database, which can be chosen by the environment variable
+'SSPDATATABLES_BENCHMARK_DB'.
+"""
+import os
+from sspdatatablesExample.settings import *  # noqa: F401,F403
+
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'SSPDATATABLES_BENCHMARK_DB',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'benchmark.sqlite3')),
+    }
+}
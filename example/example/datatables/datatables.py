@@ -19,6 +19,7 @@ class BookDataTables(DataTables):
                 "id": "id", "serializer_key": 'id',
                 "header": "ID", "searchable": True,
                 "orderable": True, "footer_type": "input",
+                "search_type": "int",
             },
             {
                 "id": "name", "serializer_key": 'name',
@@ -34,12 +35,16 @@ class BookDataTables(DataTables):
                 "id": "author_nationality", "serializer_key": 'author.nationality.name',
                 "header": "Author Nationality", "searchable": True,
                 "orderable": True, "footer_type": "select",
+                "facets": True,
             },
             {
                 "id": "published_at", "serializer_key": 'published_at',
                 "header": "Published At", "searchable": True,
                 "orderable": True, "footer_type": "input",
-                "placeholder": "YYYY-MM-DD",
+                "placeholder": "YYYY-MM-DD", "search_type": "date",
             },
         ]
         mapping = BookEnum
+        search_fields = ["name", "author__name"]
+        footer_cache_timeout = 3600
+        facet_cache_timeout = 300
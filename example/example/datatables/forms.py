@@ -9,3 +9,4 @@ class BookFieldSelectForm(AbstractFooterForm):
 
     class Meta:
         fields = [("author_nationality", ChoiceField),]
+        choices_cache_timeout = 3600
@@ -1,8 +1,12 @@
 from django.conf.urls import url
-from example.views import overview, get_book_api
+from example.views import (
+    overview, get_book_api, get_book_facets, export_book
+)
 
 
 urlpatterns = [
     url(r'^books/$', overview, name='book_overview'),
     url(r'^api/$', get_book_api, name='book_api'),
+    url(r'^facets/$', get_book_facets, name='book_facets'),
+    url(r'^export/$', export_book, name='book_export'),
 ]
\ No newline at end of file
@@ -1,22 +1,39 @@
 from django.shortcuts import render
+from django.urls import reverse
 from .datatables import BookDataTables
-from sspdatatables.utils.decorator import ensure_ajax, dt_json_response
-from collections import OrderedDict
+from sspdatatables.utils.decorator import (
+    ensure_ajax, ensure_ajax_etag, dt_json_response
+)
 
 
 def overview(request):
     book_datatables = BookDataTables()
-    context = book_datatables.get_table_frame()
+    context = book_datatables.get_table_frame(
+        facets_url=reverse('book_facets'), first_page=10)
     context.update({
         "title": "Books",
     })
     return render(request, 'overview.html', context)
 
 
-@ensure_ajax(['POST'])
+@ensure_ajax_etag(['GET'], BookDataTables)
 def get_book_api(request):
-    pre_search_condition = OrderedDict([('select_related', 'author')])
     book_datatables = BookDataTables()
-    result = book_datatables.process(pre_search_condition=pre_search_condition,
-                                     **request.POST)
+    # the stages are only measured with 'timing = True' in Meta class
+    timing = book_datatables.get_timing()
+    result = book_datatables.process(dt_request=request.GET, encoded=True,
+                                     timing=timing)
+    return dt_json_response(result, timing=timing)
+
+
+@ensure_ajax(['POST'])
+def get_book_facets(request):
+    book_datatables = BookDataTables()
+    result = book_datatables.process_facets(dt_request=request.POST)
     return dt_json_response(result)
+
+
+def export_book(request):
+    book_datatables = BookDataTables()
+    return book_datatables.export(request.GET.get('export', 'csv'),
+                                  dt_request=request.GET)
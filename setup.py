@@ -28,6 +28,10 @@ setup(
         'django',
         'djangorestframework',
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+    },
     zip_safe=False,
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class SspdatatablesConfig(AppConfig):
     name = 'sspdatatables'
+
+    def ready(self):
+        # the DataTables classes in the modules 'datatables' of the installed
+        # apps are imported in every process, such that the changes of their
+        # models bump the versions of the cached results and ETags
+        autodiscover_modules("datatables")
+        from .datatables import DataTablesMeta
+        while DataTablesMeta.pending:
+            DataTablesMeta.pending.pop(0).track_cache_models()
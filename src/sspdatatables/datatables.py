@@ -1,12 +1,40 @@
 """
 Abstract Class for using datatables package with server side processing option in Django project.
 """
-from .utils.data_type_ensure import ensure
 from .utils.enum import TripleEnum
+from .utils import keyset
+from .utils.cache import get_model_version, make_key, track_model_versions
+from .utils.count import COUNT_STRATEGIES
+from .utils.projection import compile_projection, render_rows
+from .utils.relations import plan_only, plan_related, related_models
+from .utils.export import EXPORT_FORMATS
+from .utils.plan import compile_plan
+from .utils import search
+from .utils.search_types import SearchValueError, compile_search
+from .utils.request import (
+    Column, DataTablesRequest, ensure_request, normalize_request,
+    without_column_search
+)
+from .utils.data_type_ensure import ensure
+from .utils.facets import facet_counts, label_facets
+from .utils.encoder import encode_json
+from .utils.timing import NO_TIMING, Timing
+from .utils.singleflight import flights
+import asyncio
+import re
+import time
+from asgiref.sync import sync_to_async
 from collections import OrderedDict, defaultdict
 from typing import (
-    Tuple, Any, Dict
+    Tuple, Any, Dict, List
 )
+from django.apps import apps
+from django.core.cache import cache
+from django.db import close_old_connections, connections, router
+from django.db.models import Count, Window
+from django.http import StreamingHttpResponse
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import get_language
 from rest_framework.serializers import ModelSerializer
 from .forms import AbstractFooterForm
 
@@ -18,6 +46,10 @@ class DataTablesMeta(type):
     'serializer', 'frame', 'mapping' (perhaps 'form')
     are defined as desired data type.
     """
+    pending: List[type] = []
+    """classes defined before the models are loaded, their cache models are
+    tracked by 'SspdatatablesConfig.ready'"""
+
     def __new__(mcs, name: str, bases: Tuple[type, ...],
                 namespace: Dict[str, Any]) -> type:
         """
@@ -48,6 +80,45 @@ class DataTablesMeta(type):
                 A = ("<number of the column in frontend>", "<correspinding field
                  name>", "<corresponding filter key>")
             It's the key to get the correct data from DB
+        6. pagination: optional, 'offset' (default) or 'keyset'
+        7. count_cache_timeout: optional, None (default) or the number of
+            seconds to cache the total number of records
+        8. count_strategy: optional, 'exact' (default), 'capped' or
+            'estimated', together with count_limit (default 10000)
+        9. window_count: optional, False (default) or True to fetch the
+            number of filtered records together with the page
+        10. projection: optional, False (default) or True to fetch the rows
+            with the queryset's values function instead of the serializer
+        11. auto_related: optional, True (default) or False to disable the
+            automatic select_related and prefetch_related
+        12. auto_only: optional, True (default) or False to load all the
+            columns instead of the ones rendered by the serializer
+        13. max_length: optional, None (default) or the maximum number of
+            records in a page, which also replaces the length -1 ('all')
+        14. export_chunk_size: optional, number of records fetched and
+            serialized at once by 'export', default 2000
+        15. search_fields: optional, None (default) or a list of the field
+            lookups searched by the global search, together with
+            search_config (PostgreSQL) and search_fts_table (SQLite)
+        16. response_cache_timeout: optional, None (default) or the number of
+            seconds to cache the result of 'process'
+        17. async_concurrent: optional, False (default) or True to run the
+            queries of 'aprocess' concurrently on separate connections
+        18. using: optional, None (default, the database routers decide), the
+            database alias for the counts and the page, or a dict with the
+            aliases for 'count' and 'fetch'
+        19. timing: optional, False (default) or True to measure the stages
+            of 'process', for debugging only
+        20. footer_cache_timeout: optional, None (default) or the number of
+            seconds to cache the rendered footer of 'footer.js'
+        21. facet_limit: optional, maximum number of distinct values counted
+            by 'get_facets', default 100, together with facet_cache_timeout
+            (None, default, or the number of seconds to cache them)
+        22. coalesce: optional, False (default) or True to share the result
+            of identical concurrent calls of 'process' in the process
+
+        The frame and the mapping are compiled into an immutable plan, which
+        is stored as '_plan' and read by 'get_plan'.
 
         :return: class instance
         """
@@ -105,6 +176,8 @@ class DataTablesMeta(type):
         if not issubclass(mapping, TripleEnum):
             raise ValueError("Variable 'mapping' must inherit from class "
                              "TripleEnum.")
+        if not len(mapping):
+            raise ValueError("Variable 'mapping' must not be empty.")
 
         # form can be None, if the user doesn't user footer or uses input field
         # as footer. Otherwise, it must be defined as a subclass of
@@ -113,7 +186,8 @@ class DataTablesMeta(type):
             _meta.form = None
         if not _meta.form:
             for item in frame:
-                if item.get("footer_type") not in {"input", None}:
+                if item.get("footer_type") not in {"input", None} and \
+                        not item.get("facets"):
                     raise ValueError(
                         "If you don't use 'input' as your table's footer type, "
                         "please do not leave the form as None.")
@@ -122,7 +196,199 @@ class DataTablesMeta(type):
                 "Variable 'form' must be defined as a subclass of "
                 "AbstractFooterForm or None.")
 
+        # pagination can be omitted, then the queryset is sliced with
+        # LIMIT/OFFSET. 'keyset' seeks from the boundary values of the
+        # neighbouring page instead.
+        if not hasattr(_meta, "pagination"):
+            _meta.pagination = "offset"
+        if _meta.pagination not in {"offset", "keyset"}:
+            raise ValueError("Variable 'pagination' must be either 'offset' or "
+                             "'keyset'.")
+
+        # the total number of records is only cached, if the timeout is given.
+        # The cache is invalidated by any change of the model.
+        if not hasattr(_meta, "count_cache_timeout"):
+            _meta.count_cache_timeout = None
+        if _meta.count_cache_timeout is not None:
+            if not isinstance(_meta.count_cache_timeout, int) or \
+                    _meta.count_cache_timeout < 0:
+                raise ValueError("Variable 'count_cache_timeout' must be None "
+                                 "or a non-negative integer.")
+
+        # the strategy to count the total and the filtered records. The limit
+        # is the maximum number to count for 'capped', and the smallest
+        # estimate to trust for 'estimated'.
+        if not hasattr(_meta, "count_strategy"):
+            _meta.count_strategy = "exact"
+        if _meta.count_strategy not in COUNT_STRATEGIES:
+            raise ValueError("Variable 'count_strategy' must be one of %r."
+                             % sorted(COUNT_STRATEGIES))
+        if not hasattr(_meta, "count_limit"):
+            _meta.count_limit = 10000
+        if not isinstance(_meta.count_limit, int) or _meta.count_limit < 1:
+            raise ValueError("Variable 'count_limit' must be a positive "
+                             "integer.")
+
+        # the window function count is only used for the exact count strategy
+        if not hasattr(_meta, "window_count"):
+            _meta.window_count = False
+        if not isinstance(_meta.window_count, bool):
+            raise ValueError("Variable 'window_count' must be a boolean.")
+
+        # the projection renders the rows without the serializer, a column can
+        # still use the serializer by setting 'projection' to False in frame
+        if not hasattr(_meta, "projection"):
+            _meta.projection = False
+        if not isinstance(_meta.projection, bool):
+            raise ValueError("Variable 'projection' must be a boolean.")
+
+        # the joins are worked out from the serializer and the mapping, the
+        # plan itself is built on first use, since the reverse relations are
+        # only known after all the models are loaded
+        if not hasattr(_meta, "auto_related"):
+            _meta.auto_related = True
+        if not isinstance(_meta.auto_related, bool):
+            raise ValueError("Variable 'auto_related' must be a boolean.")
+
+        # the columns not rendered by the serializer aren't loaded
+        if not hasattr(_meta, "auto_only"):
+            _meta.auto_only = True
+        if not isinstance(_meta.auto_only, bool):
+            raise ValueError("Variable 'auto_only' must be a boolean.")
+
+        # the page length is capped, the complete result can be streamed by
+        # 'export' chunk by chunk
+        if not hasattr(_meta, "max_length"):
+            _meta.max_length = None
+        if _meta.max_length is not None and (
+                not isinstance(_meta.max_length, int) or
+                _meta.max_length < 1):
+            raise ValueError("Variable 'max_length' must be None or a positive "
+                             "integer.")
+        if not hasattr(_meta, "export_chunk_size"):
+            _meta.export_chunk_size = 2000
+        if not isinstance(_meta.export_chunk_size, int) or \
+                _meta.export_chunk_size < 1:
+            raise ValueError("Variable 'export_chunk_size' must be a positive "
+                             "integer.")
+
+        # the global search is ignored without search fields. The full-text
+        # search is used on PostgreSQL, and on SQLite if the name of the FTS5
+        # table is given.
+        if not hasattr(_meta, "search_fields"):
+            _meta.search_fields = None
+        if _meta.search_fields is not None:
+            if not isinstance(_meta.search_fields, (list, tuple)) or \
+                    not _meta.search_fields or \
+                    not all(isinstance(field, str)
+                            for field in _meta.search_fields):
+                raise ValueError("Variable 'search_fields' must be None or a "
+                                 "non-empty list of strings.")
+            _meta.search_fields = tuple(_meta.search_fields)
+        if not hasattr(_meta, "search_config"):
+            _meta.search_config = None
+        if not hasattr(_meta, "search_fts_table"):
+            _meta.search_fts_table = None
+        if _meta.search_fts_table is not None:
+            if not isinstance(_meta.search_fts_table, str) or \
+                    not re.match(r"^[A-Za-z_]\w*$", _meta.search_fts_table):
+                raise ValueError("Variable 'search_fts_table' must be None or "
+                                 "a valid table name.")
+            if not _meta.search_fields:
+                raise ValueError("Variable 'search_fts_table' needs "
+                                 "'search_fields'.")
+            pk = serializer.Meta.model._meta.pk
+            if pk.get_internal_type() not in {
+                    "AutoField", "BigAutoField", "SmallAutoField",
+                    "IntegerField", "BigIntegerField", "SmallIntegerField",
+                    "PositiveIntegerField", "PositiveBigIntegerField",
+                    "PositiveSmallIntegerField"}:
+                raise ValueError("Variable 'search_fts_table' needs an integer "
+                                 "primary key.")
+            search.track_fts_table(serializer.Meta.model,
+                                   _meta.search_fts_table, _meta.search_fields)
+
+        # the result of 'process' is only cached, if the timeout is given. The
+        # cache is invalidated by any change of the model or the related
+        # models.
+        if not hasattr(_meta, "response_cache_timeout"):
+            _meta.response_cache_timeout = None
+        if _meta.response_cache_timeout is not None:
+            if not isinstance(_meta.response_cache_timeout, int) or \
+                    _meta.response_cache_timeout < 0:
+                raise ValueError("Variable 'response_cache_timeout' must be "
+                                 "None or a non-negative integer.")
+
+        # the async queries share the connection of the request by default
+        if not hasattr(_meta, "async_concurrent"):
+            _meta.async_concurrent = False
+        if not isinstance(_meta.async_concurrent, bool):
+            raise ValueError("Variable 'async_concurrent' must be a boolean.")
+
+        # the read-only queries can be sent to a replica, the counts and the
+        # page separately
+        if not hasattr(_meta, "using"):
+            _meta.using = None
+        if isinstance(_meta.using, dict):
+            if not set(_meta.using).issubset({"count", "fetch"}) or \
+                    not all(alias is None or isinstance(alias, str)
+                            for alias in _meta.using.values()):
+                raise ValueError("Variable 'using' must only map 'count' and "
+                                 "'fetch' to database aliases.")
+        elif _meta.using is not None and not isinstance(_meta.using, str):
+            raise ValueError("Variable 'using' must be None, a database alias "
+                             "or a dict.")
+
+        # the stages are only measured, if the timing is enabled
+        if not hasattr(_meta, "timing"):
+            _meta.timing = False
+        if not isinstance(_meta.timing, bool):
+            raise ValueError("Variable 'timing' must be a boolean.")
+
+        # the rendered footer is only cached, if the timeout is given
+        if not hasattr(_meta, "footer_cache_timeout"):
+            _meta.footer_cache_timeout = None
+        if _meta.footer_cache_timeout is not None:
+            if not isinstance(_meta.footer_cache_timeout, int) or \
+                    _meta.footer_cache_timeout < 0:
+                raise ValueError("Variable 'footer_cache_timeout' must be "
+                                 "None or a non-negative integer.")
+
+        # the distinct values of a column are counted on demand, they're only
+        # cached, if the timeout is given
+        if not hasattr(_meta, "facet_limit"):
+            _meta.facet_limit = 100
+        if not isinstance(_meta.facet_limit, int) or _meta.facet_limit < 1:
+            raise ValueError("Variable 'facet_limit' must be a positive "
+                             "integer.")
+        if not hasattr(_meta, "facet_cache_timeout"):
+            _meta.facet_cache_timeout = None
+        if _meta.facet_cache_timeout is not None:
+            if not isinstance(_meta.facet_cache_timeout, int) or \
+                    _meta.facet_cache_timeout < 0:
+                raise ValueError("Variable 'facet_cache_timeout' must be "
+                                 "None or a non-negative integer.")
+
+        # identical concurrent requests are only coalesced, if it's enabled
+        if not hasattr(_meta, "coalesce"):
+            _meta.coalesce = False
+        if not isinstance(_meta.coalesce, bool):
+            raise ValueError("Variable 'coalesce' must be a boolean.")
+
+        # the frame and the mapping are compiled once, the plan is shared by
+        # all the instances
+        cls._plan = compile_plan(mapping, frame)
         cls._meta = _meta
+
+        # the versions of the involved models are bumped by their changes in
+        # every process importing the class, whatever is cached (the ETags
+        # don't need any timeout). The relations can only be followed after
+        # the models are loaded, the classes defined before are tracked by
+        # 'SspdatatablesConfig.ready'.
+        if apps.models_ready:
+            cls.track_cache_models()
+        else:
+            mcs.pending.append(cls)
         return cls
 
 
@@ -139,6 +405,72 @@ class DataTables(metaclass=DataTablesMeta):
     * mapping: TripleEnum class, which holds the mapping between column number
     in frontend, corresponding field name in model class and corresponding key
     for filtering in DB
+    * pagination: optional, 'offset' or 'keyset'. With 'keyset' the page is
+    fetched by seeking from the boundary values of the previous or next page
+    instead of using an offset.
+    * count_cache_timeout: optional, seconds to cache the total number of
+    records, None disables the cache.
+    * count_strategy: optional, how to count the records: 'exact', 'capped'
+    (up to count_limit records) or 'estimated' (planner's estimate)
+    * window_count: optional, if True, the page query also returns
+    'COUNT(*) OVER ()', such that no separate query is needed for the number
+    of filtered records.
+    * projection: optional, if True, the rows are fetched with the queryset's
+    values function and rendered without the serializer. It's only used, if
+    all the serializer keys in frame can be resolved into model fields and no
+    column sets 'projection' to False.
+    * auto_related: optional, if True (default), the forward relations used by
+    the serializer and the mapping are joined with select_related and the
+    reverse and many-to-many relations used by the serializer are fetched
+    with prefetch_related.
+    * auto_only: optional, if True (default), the queryset only loads the
+    columns rendered by the serializer, including the ones of the related
+    models joined by select_related.
+    * max_length: optional, the maximum number of records in a page. A
+    length of -1 ('all') is replaced by it.
+    * export_chunk_size: optional, number of records fetched and serialized
+    at once by 'export'.
+    * search_fields: optional, the field lookups searched by the global search
+    of data tables package. Each word of the search value must match one of
+    the fields. It uses the full-text search on PostgreSQL (search_config is
+    the text search configuration) and on SQLite, if search_fts_table is the
+    name of the FTS5 table built by the management command
+    'build_search_index', otherwise 'icontains'.
+    * response_cache_timeout: optional, seconds to cache the result of
+    'process' per request (without drawing number) and pre search condition,
+    None disables the cache. Any change of the model or the related models
+    invalidates it.
+    * async_concurrent: optional, if True, 'aprocess' counts the records and
+    fetches the page at the same time, each query in its own thread with its
+    own database connection.
+    * using: optional, the database alias (e.g. a replica) for counting the
+    records and fetching the page, or a dict with separate aliases for
+    'count' and 'fetch'. By default the database routers decide. An instance
+    created with 'using' (e.g. 'default') overrides it, for reading the own
+    writes from the primary.
+    * timing: optional, if True, the duration and the number of SQL queries of
+    each stage (parse, total_count, count, fetch, serialize, encode) are
+    measured in the Timing passed to 'process', sent with the signal
+    'stage_timed' and rendered as 'Server-Timing' header by
+    'dt_json_response'. It's meant for debugging, since the header exposes
+    the timings to every client.
+    * footer_cache_timeout: optional, seconds to cache the footer rendered by
+    'footer.js' per DataTables class, prefix, table id and language, None
+    disables the cache. The footer form is only created, if the footer isn't
+    cached.
+    * facet_limit: optional, maximum number of distinct values returned by
+    'get_facets' for a column, the most frequent ones.
+    * facet_cache_timeout: optional, seconds to cache the result of
+    'get_facets', None disables the cache. Any change of the model or the
+    related models invalidates it.
+    * coalesce: optional, if True, identical calls of 'process' (the same
+    parameters without drawing number, pre search condition and database)
+    running at the same time in the process share the result of the first
+    one, the others wait for it instead of querying the database. Each call
+    gets its own copy of the result with its own drawing number. The calls
+    inside an atomic block aren't coalesced.
+    The first page can be embedded into the page by 'get_table_frame' with
+    'first_page', such that the page is shown without a request.
     Besides the Meta class, the functions, 'get_query_dict', 'query_by_args', can be
     customized by the user according to some specific use cases. The other functions are
     not necessary to be overridden.
@@ -158,6 +490,58 @@ class DataTables(metaclass=DataTablesMeta):
     """Wrapper to render the mapping in Meta class, it provides a way
         to use one DataTables class with different mappings."""
 
+    pagination = property(lambda self: self.Meta.pagination)
+    """Wrapper to render the pagination mode in Meta class"""
+
+    def __init__(self, using=None):
+        """
+        :param using: None/str: database alias overriding the one in Meta
+          class for all the queries of this instance, e.g. the primary after
+          the user changed a record
+        """
+        self.using = using
+
+    def get_timing(self):
+        """
+        function to get a new collector of the stages' durations, each call
+        of 'process' needs its own one
+
+        :return: Timing/NoTiming: NoTiming if the timing is disabled
+        """
+        if self.Meta.timing:
+            return Timing(type(self))
+        return NO_TIMING
+
+    def get_using(self, stage):
+        """
+        function to get the database alias for a stage of the queries. It can
+        be overridden, e.g. to choose the replica by the size of the table.
+
+        :param stage: str: 'count' (the total and the filtered number) or
+          'fetch' (the page or the exported records)
+        :return: None/str: database alias, None lets the database routers
+          decide
+        """
+        if self.using is not None:
+            return self.using
+        using = self.Meta.using
+        if isinstance(using, dict):
+            return using.get(stage)
+        return using
+
+    def route(self, queryset, stage):
+        """
+        function to send the queryset to the database alias of the stage
+
+        :param queryset: Django Queryset
+        :param stage: str: 'count' or 'fetch', see 'get_using'
+        :return: queryset
+        """
+        using = self.get_using(stage)
+        if using is None:
+            return queryset
+        return queryset.using(using)
+
     def footer_form(self, *args, **kwargs):
         """
         wrapper to render an instance of the footer form, which is the form in
@@ -169,10 +553,13 @@ class DataTables(metaclass=DataTablesMeta):
         """
         return self.form(*args, **kwargs)
 
-    def get_table_frame(self, prefix="", table_id="sspdtable", *args, **kwargs):
+    def get_table_frame(self, prefix="", table_id="sspdtable", *args,
+                        facets_url=None, first_page=None,
+                        pre_search_condition=None, **kwargs):
         """
         render the structure (or structure_for_superuser) and an instance of the
-        footer form
+        footer form. The footer form is created lazily, on its first use in
+        the template.
 
         :param prefix: str: used for unifying the rendered parameter's name,
             such
@@ -180,6 +567,15 @@ class DataTables(metaclass=DataTablesMeta):
             multiple times
         :param table_id: str:
         :param args: list: args for the footer form initialization
+        :param facets_url: None/str: url of the view calling
+          'process_facets', the select footers of the columns with 'facets'
+          in frame load their options from it
+        :param first_page: None/int: page length of the first page, which is
+          processed and embedded into the page as JSON, such that
+          'first_page_ajax' answers the first request of data tables package
+          with it. None disables it.
+        :param pre_search_condition: None/OrderedDict: pre search condition
+          of the first page, the same as the one of the view calling 'process'
         :param kwargs: dict: args for the footer form initialization
         :return: dict
         """
@@ -193,63 +589,190 @@ class DataTables(metaclass=DataTablesMeta):
             }
         }
         if self.form:
-            context[table_key]['footer_form'] = self.footer_form(*args, **kwargs)
+            context[table_key]['footer_form'] = SimpleLazyObject(
+                lambda: self.footer_form(*args, **kwargs))
+        if self.Meta.footer_cache_timeout is not None:
+            context[table_key]['footer_cache_timeout'] = \
+                self.Meta.footer_cache_timeout
+            context[table_key]['footer_cache_key'] = self.footer_cache_key(
+                prefix, table_id)
+        if facets_url:
+            context[table_key]['facets_url'] = facets_url
+        if first_page:
+            result = self.get_first_page(first_page, pre_search_condition)
+            if "error" not in result:
+                # the order lets the client check, if the first request asks
+                # for this page
+                context[table_key]['first_page'] = {
+                    "length": first_page,
+                    "order": [self.get_plan().default_order.index, "asc"],
+                    "result": result,
+                }
+                context[table_key]['first_page_id'] = table_id + "_first_page"
         return context
 
-    def get_query_dict(self, **kwargs):
+    def get_first_page(self, length, pre_search_condition=None):
+        """
+        function to process the first page in the default order without any
+        search, as data tables package requests it after loading the table
+
+        :param length: int: page length
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :return: dict: result of 'process'
+        """
+        dt_request = DataTablesRequest()
+        dt_request.length = length
+        dt_request.total_cols = len(self.frame)
+        for i, item in enumerate(self.frame):
+            column = dt_request.columns[i] = Column()
+            column.data = item["serializer_key"] or ""
+            column.searchable = bool(item["searchable"])
+            column.orderable = bool(item["orderable"])
+        return self.process(pre_search_condition, dt_request)
+
+    def footer_cache_key(self, prefix, table_id):
+        """
+        function to build the cache key of the rendered footer: the DataTables
+        class, the prefix, the table id, the frame, the version of the footer
+        form's choices and the language
+
+        :param prefix: str: prefix of the table's context variable
+        :param table_id: str: id of the table
+        :return: str
+        """
+        return make_key("footer", type(self).__module__,
+                        type(self).__qualname__, prefix, table_id, self.frame,
+                        self.form.choices_version() if self.form else None,
+                        get_language())
+
+    def get_plan(self):
+        """
+        function to get the compiled plan of the mapping and the frame. The
+        plan compiled by the meta class is used, unless the mapping or the
+        frame is overridden.
+
+        :return: TablePlan
+        """
+        mapping, frame = self.mapping, self.frame
+        if mapping is self.Meta.mapping and frame is self.Meta.frame:
+            return self._plan
+        return compile_plan(mapping, frame)
+
+    def get_query_dict(self, dt_request=None, **kwargs):
         """
         function to generate a filter dictionary, in which the key is the
         keyword used in django filter function in string form, and the value is
-        the searched value.
+        the searched value. Only the columns which are searchable in frame are
+        used. The search value of a column with a search type is parsed into
+        the lookups 'exact', 'range', 'gte', 'lte' or 'in', an invalid value
+        raises SearchValueError.
 
-        :param kwargs:dict: query dict sent by data tables package
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param kwargs: dict: query dict sent by data tables package, used if
+          dt_request is None
         :return: dict: filtering dictionary
         """
-        total_cols = ensure(int, kwargs.get('total_cols', [0])[0], 0)
-        mapping = self.mapping
+        dt_request = ensure_request(dt_request, **kwargs)
+        total_cols = dt_request.total_cols
+        plan = self.get_plan()
         filter_dict = defaultdict(dict)
 
-        # set up the starter, since sometimes we start the enumeration from '1'
-        starter = mapping.keys()[0]
-        for i in range(starter, total_cols):
-            key = 'columns[{index}]'.format(index=i)
-            if kwargs.get(key + '[searchable]', [0])[0] != 'true':
+        for i, column in sorted(dt_request.columns.items()):
+            if i not in plan.searchable or not column.searchable:
                 continue
-            search_value = kwargs.get(key + '[search][value]', [''])[0].strip()
+            if total_cols is not None and i >= total_cols:
+                continue
+            search_value = column.search.strip()
             if not search_value:
                 continue
-            enum_item = mapping.from_key(i)
-            filter_obj = enum_item.extra
-            if type(filter_obj) is tuple and len(filter_obj) == 2:
-                filter_func, filter_key = filter_obj
-                filter_dict[filter_func][filter_key] = search_value
-            elif type(filter_obj) is str:
-                filter_dict['filter'][filter_obj] = search_value
-            else:
+            column_plan = plan.columns[i]
+            if column_plan.filter_func is None:
                 raise ValueError("Invalid filter key.")
+            filter_dict[column_plan.filter_func].update(compile_search(
+                column_plan.filter_key, column_plan.search_type, search_value))
         return filter_dict
 
-    def get_order_key(self, **kwargs):
+    def get_order_key(self, dt_request=None, **kwargs):
         """
         function to get the order key to apply it in the filtered queryset
 
-        :param kwargs: dict: query dict sent by data tables package
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param kwargs: dict: query dict sent by data tables package, used if
+          dt_request is None
         :return: str: order key, which can be used directly in queryset's
           order_by function
         """
-        # get the mapping enumeration class from Meta class
-        mapping = self.mapping
+        dt_request = ensure_request(dt_request, **kwargs)
+        plan = self.get_plan()
         # use the first element in the enumeration as default order column
-        order_column = kwargs.get('order[0][column]',
-                                  [mapping.keys()[0]])[0]
-        order_column = ensure(int, order_column, mapping.keys()[0])
-        order = kwargs.get('order[0][dir]', ['asc'])[0]
-
-        order_key = mapping.from_key(order_column).label
+        column_plan, order = plan.default_order, 'asc'
+        if dt_request.order:
+            column_plan = plan.columns.get(dt_request.order[0].column,
+                                           column_plan)
+            order = dt_request.order[0].dir
         # django orm '-' -> desc
         if order == 'desc':
-            order_key = '-' + order_key
-        return order_key
+            return column_plan.order_desc
+        return column_plan.order_asc
+
+    def get_projection(self):
+        """
+        function to get the projection of the serializer keys in frame, which
+        is used for fetching the rows with the queryset's values function
+
+        :return: None/Projection: None if the projection isn't enabled or one
+          of the columns needs the serializer
+        """
+        if not self.Meta.projection:
+            return None
+        if any(item["serializer_key"] and item.get("projection") is False
+               for item in self.frame):
+            return None
+        return compile_projection(self.serializer,
+                                  self.get_plan().serializer_keys)
+
+    def get_related_plan(self):
+        """
+        function to get the select_related and prefetch_related lookups, which
+        are worked out from the serializer and the mapping
+
+        :return: None/RelatedPlan: None if 'auto_related' is disabled
+        """
+        if not self.Meta.auto_related:
+            return None
+        return plan_related(self.serializer, self.mapping)
+
+    def defer_columns(self, queryset):
+        """
+        function to restrict the columns loaded by the queryset to the ones
+        rendered by the serializer, using the queryset's only function. The
+        queryset isn't changed, if the columns can't be worked out, e.g. the
+        serializer has a SerializerMethodField, or the pre search condition
+        already uses values, only, defer or joins other relations.
+
+        :param queryset: Django Queryset: queryset after applying the pre
+          search condition
+        :return: queryset
+        """
+        query = queryset.query
+        if not self.Meta.auto_only or query.select_related is True or \
+                query.deferred_loading[0] or queryset._fields is not None:
+            return queryset
+        select_related = []
+        pending = [("", query.select_related or {})]
+        while pending:
+            prefix, relations = pending.pop()
+            for name, nested in relations.items():
+                select_related.append(prefix + name)
+                pending.append((prefix + name + "__", nested))
+        columns = plan_only(self.serializer, tuple(sorted(select_related)))
+        # the relations joined by the pre search condition but not rendered
+        # by the serializer would be deferred and traversed at the same time
+        if columns is None or not set(select_related).issubset(columns):
+            return queryset
+        return queryset.only(*columns)
 
     @staticmethod
     def filtering(queryset, query_dict):
@@ -274,24 +797,301 @@ class DataTables(metaclass=DataTablesMeta):
                 queryset = getattr(queryset, key)(value)
         return queryset
 
+    def searching(self, queryset, search_value):
+        """
+        function to apply the global search to the queryset, using the search
+        fields defined in Meta class. It uses the full-text search of
+        PostgreSQL or SQLite (FTS5 table, if it's built), otherwise the fields
+        are searched with 'icontains'.
+
+        :param queryset: Django Queryset: queryset to search
+        :param search_value: str: value of the global search
+        :return: queryset
+        """
+        fields = self.Meta.search_fields
+        search_value = search_value.strip()
+        if not fields or not search_value:
+            return queryset
+        tokens = search.search_tokens(search_value)
+        vendor = connections[queryset.db].vendor
+        if tokens and vendor == "postgresql":
+            return search.postgres_search(queryset, fields, tokens,
+                                          self.Meta.search_config)
+        table = self.Meta.search_fts_table
+        # the FTS5 table is built by the management command
+        # 'build_search_index', the search never writes into the database
+        if tokens and table and vendor == "sqlite" and \
+                search.fts_ready(queryset.db, table):
+            return search.sqlite_search(queryset, table, tokens)
+        return queryset.filter(search.icontains_condition(fields,
+                                                          search_value))
+
+    def build_search_index(self, using="default"):
+        """
+        function to create and fill the FTS5 table of the global search on
+        SQLite, if it doesn't exist yet. It's run by the management command
+        'build_search_index' (or a data migration) on the database written to,
+        never by a request.
+
+        :param using: str: database alias
+        :return: None
+        """
+        if not self.Meta.search_fts_table:
+            raise AttributeError("Variable 'search_fts_table' isn't defined "
+                                 "in Meta class.")
+        search.ensure_fts_table(self.serializer.Meta.model,
+                                self.Meta.search_fts_table,
+                                self.Meta.search_fields, using)
+
+    def rebuild_search_index(self, using="default"):
+        """
+        function to rebuild the FTS5 table of the global search on SQLite,
+        e.g. after changing the search fields or after changes, which don't
+        send the signals post_save and post_delete
+
+        :param using: str: database alias
+        :return: None
+        """
+        if not self.Meta.search_fts_table:
+            raise AttributeError("Variable 'search_fts_table' isn't defined "
+                                 "in Meta class.")
+        search.rebuild_fts_table(self.serializer.Meta.model,
+                                 self.Meta.search_fts_table,
+                                 self.Meta.search_fields, using)
+
+    def get_page(self, dt_request):
+        """
+        function to get the start position and the length of the page. The
+        length is capped by 'max_length' in Meta class, which also replaces
+        the length -1 (display all the records).
+
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: tuple: start and length, the length -1 means all the records
+        """
+        length = dt_request.length
+        start = max(dt_request.start, 0)
+        max_length = self.Meta.max_length
+        if max_length is not None and (length < 0 or length > max_length):
+            length = max_length
+        return start, length
+
     @staticmethod
-    def slicing(queryset, **kwargs):
+    def slicing(queryset, dt_request=None, **kwargs):
         """
         function to slice the queryset according to the display length
 
         :param queryset: Django Queryset: filtered and ordered queryset result
-        :param kwargs: dict: query dict sent by data tables package
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param kwargs: dict: query dict sent by data tables package, used if
+          dt_request is None
         :return: queryset: result after slicing
         """
         # if the length is -1, we need to display all the records
         # otherwise, just slicing the queryset
-        length = ensure(int, kwargs.get('length', [0])[0], 0)
-        start = ensure(int, kwargs.get('start', [0])[0], 0)
+        dt_request = ensure_request(dt_request, **kwargs)
+        length, start = dt_request.length, max(dt_request.start, 0)
         if length >= 0:
             queryset = queryset[start:start + length]
         return queryset
 
-    def query_by_args(self, pre_search_condition=None, **kwargs):
+    def slice_page(self, queryset, dt_request):
+        """
+        function to slice the page out of the queryset with 'slicing', the
+        length is capped by 'max_length' in Meta class (see 'get_page')
+
+        :param queryset: Django Queryset: filtered and ordered queryset result
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: queryset: result after slicing
+        """
+        start, length = self.get_page(dt_request)
+        return self.slicing(queryset, {"start": start, "length": length})
+
+    def count_records(self, queryset):
+        """
+        function to count the records in the queryset with the count strategy
+        defined in Meta class
+
+        :param queryset: Django Queryset: queryset to count
+        :return: tuple: number of the records and whether it's approximate
+        """
+        strategy = COUNT_STRATEGIES[self.Meta.count_strategy]
+        return strategy(self.route(queryset, "count"), self.Meta.count_limit)
+
+    def total_count_key(self, queryset, pre_search_condition=None):
+        """
+        function to build the cache key of the total number of records: the
+        DataTables class, the model's version, the count strategy and the pre
+        search condition
+
+        :param queryset: Django Queryset: queryset after applying the pre
+          search condition
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :return: str
+        """
+        return make_key("total", type(self).__module__,
+                        type(self).__qualname__,
+                        get_model_version(queryset.model),
+                        self.Meta.count_strategy, self.Meta.count_limit,
+                        pre_search_condition)
+
+    def total_count(self, queryset, pre_search_condition=None):
+        """
+        function to count the records before applying the search conditions
+        from the user. If 'count_cache_timeout' is defined in Meta class, the
+        number is cached per DataTables class and pre search condition until
+        the timeout is reached or the model is changed.
+
+        :param queryset: Django Queryset: queryset after applying the pre
+          search condition
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :return: tuple: number of the total records and whether it's
+          approximate
+        """
+        timeout = self.Meta.count_cache_timeout
+        if timeout is None:
+            return self.count_records(queryset)
+        key = self.total_count_key(queryset, pre_search_condition)
+        total = cache.get(key)
+        if total is None:
+            total = self.count_records(queryset)
+            cache.set(key, total, timeout)
+        return total
+
+    def use_window_count(self, queryset):
+        """
+        function to check if the number of the filtered records can be
+        fetched together with the page: it's enabled in Meta class, the
+        records are counted exactly, the pagination uses offset and the
+        database supports window functions.
+
+        :param queryset: Django Queryset: filtered queryset
+        :return: bool
+        """
+        return (self.Meta.window_count and
+                self.Meta.count_strategy == "exact" and
+                self.pagination == "offset" and
+                connections[queryset.db].features.supports_over_clause)
+
+    def window_slicing(self, queryset, dt_request):
+        """
+        function to slice the ordered queryset and fetch the number of all
+        the records in the queryset within the same query, using the window
+        function 'COUNT(*) OVER ()'
+
+        :param queryset: Django Queryset: filtered and ordered queryset
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: tuple: list of the records in the page and the number of the
+          records in the queryset, None if it can't be derived from the page
+        """
+        queryset = queryset.annotate(
+            dt_window_count=Window(expression=Count('*')))
+        items = list(self.slice_page(queryset, dt_request))
+        if items:
+            first = items[0]
+            if isinstance(first, dict):
+                return items, first['dt_window_count']
+            return items, first.dt_window_count
+        # an empty first page means there is no record at all
+        start, length = self.get_page(dt_request)
+        if start <= 0 and length != 0:
+            return items, 0
+        return items, None
+
+    def keyset_slicing(self, queryset, order_key, query_dict, dt_request):
+        """
+        function to order and slice the queryset using the keyset (seek)
+        pagination. The primary key is added to the ordering as tie-breaker.
+        If the cursor sent by the frontend describes the previous or the next
+        page of the requested one, the page is fetched by seeking from its
+        boundary values, otherwise it falls back to LIMIT/OFFSET. An ordering
+        with a nullable field always uses LIMIT/OFFSET, since the seek
+        condition can't match the nulls.
+
+        :param queryset: Django Queryset: filtered queryset
+        :param order_key: str: order key returned by 'get_order_key'
+        :param query_dict: dict: filter dictionary returned by 'get_query_dict'
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: tuple: list of the records in the page and the cursor for
+          the next request
+        """
+        start, length = self.get_page(dt_request)
+        ordering = keyset.get_ordering(order_key,
+                                       queryset.model._meta.pk.name)
+        digest = keyset.query_digest(
+            order_key, sorted((k, sorted(v.items()))
+                              for k, v in query_dict.items()),
+            dt_request.search.strip() if self.Meta.search_fields else "")
+        cursor = keyset.load_cursor(dt_request.extra.get('cursor', ''), digest)
+        queryset = queryset.annotate(**keyset.annotations(ordering))
+        ordered = queryset.order_by(*keyset.order_by_args(ordering))
+
+        if not keyset.seekable(queryset.model, ordering):
+            items = list(ordered if length < 0 else
+                         ordered[start:start + length])
+            return items, ""
+        if length < 0:
+            items = list(ordered)
+        elif cursor and start > 0 and \
+                start == cursor["start"] + cursor["size"]:
+            # next page: seek after the last row of the cursor's page
+            condition = keyset.seek_condition(ordering, cursor["last"])
+            items = list(ordered.filter(condition)[:length])
+        elif cursor and start > 0 and start == cursor["start"] - length:
+            # previous page: seek backwards from the first row of the cursor's
+            # page and restore the order afterwards
+            condition = keyset.seek_condition(ordering, cursor["first"],
+                                              forward=False)
+            backward = queryset.order_by(
+                *keyset.order_by_args(ordering, reverse=True))
+            items = list(backward.filter(condition)[:length])
+            items.reverse()
+        elif cursor and start > 0 and start == cursor["start"]:
+            # same page again, e.g. the display length is changed
+            condition = keyset.seek_condition(ordering, cursor["first"],
+                                              inclusive=True)
+            items = list(ordered.filter(condition)[:length])
+        else:
+            items = list(ordered[start:start + length])
+        return items, keyset.dump_cursor(start, items, ordering, digest)
+
+    def get_queryset(self, pre_search_condition=None):
+        """
+        function to build the queryset before applying the search conditions
+        from the user: the related records are joined, the pre search
+        condition is applied and only the rendered columns are loaded.
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :return: queryset
+        """
+        # get the model from the serializer parameter
+        model_class = self.serializer.Meta.model
+        # get the objects
+        queryset = model_class.objects.all()
+
+        # join the related records needed by the serializer, the projection
+        # fetches them with the values function
+        projection = self.get_projection()
+        related_plan = self.get_related_plan()
+        if related_plan and not projection:
+            if related_plan.select_related:
+                queryset = queryset.select_related(
+                    *related_plan.select_related)
+            if related_plan.prefetch_related:
+                queryset = queryset.prefetch_related(
+                    *related_plan.prefetch_related)
+
+        # apply the pre search condition if it exists
+        if pre_search_condition:
+            queryset = self.filtering(queryset, pre_search_condition)
+
+        # only load the columns rendered by the serializer
+        if not projection:
+            queryset = self.defer_columns(queryset)
+        return queryset
+
+    def query_by_args(self, pre_search_condition=None, dt_request=None,
+                      timing=NO_TIMING, **kwargs):
         """
         intends to process the queries sent by data tables package in frontend.
         The model_cls indicates the model class, get_query_dict is a function
@@ -302,66 +1102,741 @@ class DataTables(metaclass=DataTablesMeta):
         :param pre_search_condition: None/OrderedDict: dictionary contains
           filter conditions which should be processed before applying the filter
           dictionary from user. None, if no pre_search_condition provided.
-        :param kwargs: QueryDict: contains query parameters
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param timing: Timing/NoTiming: collector of the stages' durations
+        :param kwargs: QueryDict: contains query parameters, used if
+          dt_request is None
         :return: dict: contains total records number, queryset of the filtered
-          instances, size of this queryset
+          instances, size of this queryset and whether the numbers are
+          approximate
         """
         if pre_search_condition and not isinstance(pre_search_condition, OrderedDict):
             raise TypeError(
                 "Parameter 'pre_search_condition' must be an OrderedDict.")
-        # extract requisite parameters from kwargs
-        draw = ensure(int, kwargs.get('draw', [0])[0], 0)
+        with timing.stage("parse"):
+            # parse the parameters once for all the following steps
+            dt_request = ensure_request(dt_request, **kwargs)
+            draw = dt_request.draw
 
-        # just implement the get_query_dict function
-        query_dict = self.get_query_dict(**kwargs)
-        order_key = self.get_order_key(**kwargs)
+            # just implement the get_query_dict function
+            query_dict = self.get_query_dict(dt_request)
+            order_key = self.get_order_key(dt_request)
 
-        # get the model from the serializer parameter
-        model_class = self.serializer.Meta.model
-        # get the objects
-        queryset = model_class.objects
+            projection = self.get_projection()
+            queryset = self.get_queryset(pre_search_condition)
 
-        # apply the pre search condition if it exists
-        if pre_search_condition:
-            queryset = self.filtering(queryset, pre_search_condition)
+        # number of the total records
+        with timing.stage("total_count"):
+            total, total_approximate = self.total_count(queryset,
+                                                        pre_search_condition)
+
+        # only fetch the columns of the projection
+        if projection:
+            queryset = queryset.values(*projection.lookups)
+
+        search_value = dt_request.search.strip() \
+            if self.Meta.search_fields else ""
+        filtered = bool(query_dict or search_value)
+        if query_dict:
+            queryset = self.filtering(queryset, query_dict)
+        if search_value:
+            queryset = self.searching(queryset, search_value)
+        # the page is fetched from the database alias for fetching
+        fetch_queryset = self.route(queryset, "fetch")
+
+        items = None
+        if not filtered:
+            # without query the number of the filtered records is the total
+            # number
+            count, count_approximate = total, total_approximate
         else:
-            queryset = queryset.all()
+            count, count_approximate = None, False
+            # the number of the filtered records comes together with the page,
+            # if the window function can be used
+            if self.use_window_count(fetch_queryset):
+                with timing.stage("fetch"):
+                    items, count = self.window_slicing(
+                        fetch_queryset.order_by(order_key), dt_request)
+            # number of the records after applying the query
+            if count is None:
+                with timing.stage("count"):
+                    count, count_approximate = self.count_records(queryset)
 
-        # number of the total records
-        total = queryset.count()
+        result = {'count': count, 'total': total, 'draw': draw,
+                  'approximate': total_approximate or count_approximate}
+        if items is not None:
+            # the page is already fetched together with the number
+            result['items'] = items
+        elif self.pagination == "keyset":
+            with timing.stage("fetch"):
+                result['items'], result['cursor'] = self.keyset_slicing(
+                    fetch_queryset, order_key, query_dict, dt_request)
+        else:
+            # order the queryset
+            queryset = fetch_queryset.order_by(order_key)
+            # slice the queryset
+            result['items'] = self.slice_page(queryset, dt_request)
+            if timing is not NO_TIMING:
+                # fetch the page here, such that it's measured separately
+                with timing.stage("fetch"):
+                    result['items'] = list(result['items'])
+        return result
+
+    @classmethod
+    def get_cache_models(cls):
+        """
+        function to get the models, whose changes invalidate the cached
+        results: the serializer's model and the models related by the
+        serializer, the mapping and the search fields
+
+        :return: tuple of Django Model classes
+        """
+        serializer = cls.Meta.serializer
+        related_plan = plan_related(serializer, cls.Meta.mapping)
+        return related_models(serializer.Meta.model,
+                              related_plan.select_related +
+                              related_plan.prefetch_related +
+                              (cls.Meta.search_fields or ()))
+
+    @classmethod
+    def track_cache_models(cls):
+        """
+        function to connect the signals post_save and post_delete of the
+        models returned by 'get_cache_models', such that their changes bump
+        the versions in the cache keys. It's called once the class is defined
+        and the models are loaded.
+
+        :return: None
+        """
+        for model in cls.get_cache_models():
+            track_model_versions(model)
+
+    def response_cache_key(self, pre_search_condition, dt_request):
+        """
+        function to build the cache key of the result of 'process': the
+        DataTables class, the versions of the involved models, the parsed
+        parameters without drawing number and the pre search condition
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: str
+        """
+        return make_key("response", type(self).__module__,
+                        type(self).__qualname__,
+                        [get_model_version(model)
+                         for model in self.get_cache_models()],
+                        normalize_request(dt_request), pre_search_condition)
+
+    def facet_cache_key(self, column, pre_search_condition, query_dict,
+                        search_value):
+        """
+        function to build the cache key of the result of 'get_facets': the
+        DataTables class, the versions of the involved models, the column and
+        the search conditions
+
+        :param column: int: number of the column
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param query_dict: dict: filtering dictionary without the column
+        :param search_value: str: value of the global search
+        :return: str
+        """
+        return make_key("facets", type(self).__module__,
+                        type(self).__qualname__,
+                        [get_model_version(model)
+                         for model in self.get_cache_models()],
+                        column, query_dict, search_value, pre_search_condition)
+
+    def get_facets(self, column, pre_search_condition=None, dt_request=None,
+                   **kwargs):
+        """
+        function to count the records per distinct value of a searchable
+        column in one grouped query, under the search conditions of the
+        request. The search value of the column itself is ignored, such that
+        all its alternatives are counted.
 
-        # if the query dict not empty, then apply the query dict
+        :param column: int: number of the column in frontend
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param kwargs: dict: query dict sent by data tables package, used if
+          dt_request is None
+        :return: dict: number of the column, list of the values (dict with
+          value, label and count) and whether there are more values than
+          'facet_limit'
+        """
+        if pre_search_condition and not isinstance(pre_search_condition, OrderedDict):
+            raise TypeError(
+                "Parameter 'pre_search_condition' must be an OrderedDict.")
+        plan = self.get_plan()
+        if column not in plan.searchable:
+            raise ValueError("Column %r isn't searchable." % column)
+        dt_request = without_column_search(
+            ensure_request(dt_request, **kwargs), column)
+        query_dict = self.get_query_dict(dt_request)
+        search_value = dt_request.search.strip() \
+            if self.Meta.search_fields else ""
+
+        timeout = self.Meta.facet_cache_timeout
+        key = None
+        if timeout is not None:
+            key = self.facet_cache_key(column, pre_search_condition,
+                                       query_dict, search_value)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        model = self.serializer.Meta.model
+        queryset = model.objects.all()
+        if pre_search_condition:
+            queryset = self.filtering(queryset, pre_search_condition)
         if query_dict:
             queryset = self.filtering(queryset, query_dict)
+        if search_value:
+            queryset = self.searching(queryset, search_value)
+        lookup = plan.columns[column].order_asc
+        rows, truncated = facet_counts(self.route(queryset, "count"), lookup,
+                                       self.Meta.facet_limit)
+        result = {"column": column, "truncated": truncated,
+                  "values": label_facets(model, lookup, rows)}
+        if key is not None:
+            cache.set(key, result, timeout)
+        return result
 
-        # number of the records after applying the query
-        count = queryset.count()
+    def process_facets(self, pre_search_condition=None, dt_request=None,
+                       encoded=False, **kwargs):
+        """
+        function to be called outside to get the facets of the column given
+        by the parameter 'facet', which the select footers send together with
+        the parameters of the table's last request
 
-        # order the queryset
-        queryset = queryset.order_by(order_key)
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          the footer, e.g. request.POST, or its parsed result
+        :param encoded: bool: return the result encoded as json bytes
+        :param kwargs: dict: query dict sent by the footer, used if dt_request
+          is None
+        :return: dict/bytes: result of 'get_facets'. If the column or a search
+          value is invalid, it contains the error message instead,
+          'dt_json_response' renders it as error response.
+        """
+        dt_request = ensure_request(dt_request, **kwargs)
+        column = ensure(int, dt_request.extra.get("facet"))
+        try:
+            if column is None:
+                raise ValueError("Parameter 'facet' must be the number of a "
+                                 "column.")
+            result = self.get_facets(column, pre_search_condition,
+                                     dt_request)
+        except ValueError as error:
+            result = {"error": str(error), "draw": dt_request.draw}
+        if encoded:
+            return encode_json(result)
+        return result
 
-        # slice the queryset
-        queryset = self.slicing(queryset, **kwargs)
-        return {'items': queryset, 'count': count, 'total': total, 'draw': draw}
+    def etag(self, pre_search_condition=None, dt_request=None, **kwargs):
+        """
+        function to build the weak ETag of the result of 'process', from the
+        same parts as its cache key. It changes with the versions of the
+        involved models and the parameters, but not with the drawing number,
+        and it's built without any query.
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+        :param kwargs: dict: search parameters, used if dt_request is None
+        :return: None/str: None if the cache doesn't keep the versions, e.g.
+          DummyCache, since the ETag would never change
+        """
+        dt_request = ensure_request(dt_request, **kwargs)
+        if None in [get_model_version(model)
+                    for model in self.get_cache_models()]:
+            return None
+        key = self.response_cache_key(pre_search_condition, dt_request)
+        return 'W/"%s"' % key.rsplit(":", 1)[-1]
 
-    def process(self, pre_search_condition=None, **kwargs):
+    def process(self, pre_search_condition=None, dt_request=None,
+                encoded=False, timing=None, **kwargs):
         """
         function to be called outside to get the footer search condition,
         apply the search in DB and render the serialized result.
 
         :param pre_search_condition: None/OrderedDict: pre search condition to
           be applied before applying the one getting from footer
-        :param kwargs: dict: search parameters got from footer
-        :return: dict: contains the filtered data, total number of records,
-            number of filtered records and drawing number.
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+          got from footer, e.g. request.POST, or its parsed result
+        :param encoded: bool: return the result encoded as json bytes, which
+          'dt_json_response' passes to the response directly
+        :param timing: None/Timing: collector of the stages' durations, e.g.
+          from 'get_timing' for passing it to 'dt_json_response' afterwards.
+          None creates a new one for this call.
+        :param kwargs: dict: search parameters got from footer, used if
+          dt_request is None
+        :return: dict/bytes: contains the filtered data, total number of
+            records, number of filtered records, drawing number and whether
+            the numbers of records are approximate. If a search value is
+            invalid, it contains the error message instead, 'dt_json_response'
+            renders it as error response.
+        """
+        # each call measures its own stages, the instance may be shared
+        if timing is None:
+            timing = self.get_timing()
+        result = self._process(pre_search_condition, dt_request, timing,
+                               **kwargs)
+        if encoded:
+            with timing.stage("encode", count_queries=False):
+                return encode_json(result)
+        return result
+
+    def _process(self, pre_search_condition=None, dt_request=None,
+                 timing=NO_TIMING, **kwargs):
+        """
+        function to build the result of 'process' as dictionary
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+        :param timing: Timing/NoTiming: collector of the stages' durations
+        :param kwargs: dict: search parameters, used if dt_request is None
+        :return: dict
+        """
+        with timing.stage("parse"):
+            dt_request = ensure_request(dt_request, **kwargs)
+        # the cached result is shared by all the drawing numbers
+        timeout = self.Meta.response_cache_timeout
+        key = None
+        if timeout is not None:
+            with timing.stage("cache"):
+                key = self.response_cache_key(pre_search_condition,
+                                              dt_request)
+                cached = cache.get(key)
+            if cached is not None:
+                return dict(cached, draw=dt_request.draw)
+        # the calls inside a transaction may see its uncommitted changes,
+        # they aren't shared with the other threads
+        if not self.Meta.coalesce or self.in_atomic_block():
+            return self._build_result(pre_search_condition, dt_request,
+                                      timing, key)
+        start = time.perf_counter()
+        result, shared = flights.do(
+            self.coalesce_key(pre_search_condition, dt_request),
+            lambda: self._build_result(pre_search_condition, dt_request,
+                                       timing, key))
+        if shared:
+            timing.add("coalesce", (time.perf_counter() - start) * 1000)
+        # the result is shared, each call gets its own drawing number
+        return dict(result, draw=dt_request.draw)
+
+    def _build_result(self, pre_search_condition, dt_request,
+                      timing=NO_TIMING, key=None):
+        """
+        function to query and serialize the records for 'process', and to
+        cache the result
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: DataTablesRequest: parsed query dict
+        :param timing: Timing/NoTiming: collector of the stages' durations
+        :param key: None/str: cache key of the result, None if it isn't cached
+        :return: dict
+        """
+        try:
+            records = self.query_by_args(
+                pre_search_condition=pre_search_condition,
+                dt_request=dt_request, timing=timing)
+        except SearchValueError as error:
+            # the invalid search value never reaches the database
+            return self.error_result(error, dt_request)
+        with timing.stage("serialize"):
+            data = self.serialize(records['items'])
+        result = self.format_result(records, data)
+        if key is not None:
+            cache.set(key, dict(result, data=list(result['data'])),
+                      self.Meta.response_cache_timeout)
+        return result
+
+    def in_atomic_block(self):
+        """
+        function to check if the connection of a stage of the queries is in
+        an atomic block of the current thread, e.g. the view runs with
+        'ATOMIC_REQUESTS'
+
+        :return: bool
+        """
+        model = self.serializer.Meta.model
+        return any(connections[self.get_using(stage) or
+                               router.db_for_read(model)].in_atomic_block
+                   for stage in ("count", "fetch"))
+
+    def coalesce_key(self, pre_search_condition, dt_request):
+        """
+        function to build the key of the identical calls of 'process': the
+        DataTables class, the database aliases, the parameters without
+        drawing number and the pre search condition
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: str
+        """
+        return make_key("coalesce", type(self).__module__,
+                        type(self).__qualname__, self.get_using("count"),
+                        self.get_using("fetch"), normalize_request(dt_request),
+                        pre_search_condition)
+
+    @staticmethod
+    def format_result(records, data):
+        """
+        function to put the result of 'query_by_args' and the serialized
+        records into the format of data tables package
+
+        :param records: dict: result of 'query_by_args'
+        :param data: list of dict: serialized records
+        :return: dict
         """
-        records = self.query_by_args(pre_search_condition=pre_search_condition,
-                                     **kwargs)
-        serializer = self.serializer(records['items'], many=True)
         result = {
-            'data': serializer.data,
+            'data': data,
             'draw': records['draw'],
             'recordsTotal': records['total'],
             'recordsFiltered': records['count'],
+            'recordsApproximate': records['approximate'],
         }
+        # the cursor of the keyset pagination is sent back with the next
+        # request
+        if 'cursor' in records:
+            result['cursor'] = records['cursor']
+        return result
+
+    @staticmethod
+    def error_result(error, dt_request):
+        """
+        function to build the result for an invalid request, which
+        'dt_json_response' renders as error response
+
+        :param error: Exception: error to report
+        :param dt_request: DataTablesRequest: parsed query dict
+        :return: dict
+        """
+        return {'error': str(error), 'draw': dt_request.draw,
+                'recordsTotal': 0, 'recordsFiltered': 0, 'data': []}
+
+    def serialize(self, items):
+        """
+        function to serialize the records, either by the projection or by the
+        serializer in Meta class
+
+        :param items: list/queryset: records to serialize
+        :return: list of dict
+        """
+        projection = self.get_projection()
+        if projection:
+            return render_rows(items, projection)
+        return self.serializer(items, many=True).data
+
+    def iter_serialized(self, queryset):
+        """
+        function to serialize all the records of the queryset chunk by chunk,
+        such that only 'export_chunk_size' records are held in memory at once
+
+        :param queryset: Django Queryset: filtered and ordered queryset
+        :return: generator of dict
+        """
+        chunk_size = self.Meta.export_chunk_size
+        chunk = []
+        for item in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield from self.serialize(chunk)
+                chunk = []
+        if chunk:
+            yield from self.serialize(chunk)
+
+    def export(self, export_format="csv", pre_search_condition=None,
+               filename=None, dt_request=None, **kwargs):
+        """
+        function to stream all the filtered and ordered records as a csv or
+        ndjson file, regardless of the page sent by data tables package. The
+        records are fetched with the database cursor and serialized chunk by
+        chunk, so the memory usage doesn't grow with the number of records.
+
+        :param export_format: str: 'csv' or 'ndjson'
+        :param pre_search_condition: None/OrderedDict: pre search condition to
+          be applied before applying the one getting from footer
+        :param filename: None/str: name of the downloaded file, by default the
+          model's name with the format as extension
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+          got from footer, e.g. request.GET, or its parsed result
+        :param kwargs: dict: search parameters got from footer, used if
+          dt_request is None
+        :return: StreamingHttpResponse
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError("Parameter 'export_format' must be one of %r."
+                             % sorted(EXPORT_FORMATS))
+        if pre_search_condition and not isinstance(pre_search_condition, OrderedDict):
+            raise TypeError(
+                "Parameter 'pre_search_condition' must be an OrderedDict.")
+        dt_request = ensure_request(dt_request, **kwargs)
+        query_dict = self.get_query_dict(dt_request)
+        order_key = self.get_order_key(dt_request)
+
+        queryset = self.get_queryset(pre_search_condition)
+        projection = self.get_projection()
+        if projection:
+            queryset = queryset.values(*projection.lookups)
+        if query_dict:
+            queryset = self.filtering(queryset, query_dict)
+        queryset = self.searching(queryset, dt_request.search)
+        queryset = self.route(queryset, "fetch").order_by(order_key)
+
+        content_type, stream = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            stream(self.frame, self.iter_serialized(queryset)),
+            content_type=content_type)
+        if filename is None:
+            filename = "%s.%s" % (queryset.model._meta.model_name,
+                                  export_format)
+        response['Content-Disposition'] = 'attachment; filename="%s"' \
+                                          % filename
+        return response
+
+    def use_concurrency(self, queryset):
+        """
+        function to check if the queries of 'aquery_by_args' can run at the
+        same time on separate connections: it's enabled in Meta class, the
+        request isn't inside a transaction (the other connections wouldn't see
+        its changes) and the databases aren't in-memory SQLite databases (each
+        connection would have its own one).
+
+        :param queryset: Django Queryset: queryset to query
+        :return: bool
+        """
+        if not self.Meta.async_concurrent:
+            return False
+        for stage in ("count", "fetch"):
+            connection = connections[self.route(queryset, stage).db]
+            if connection.in_atomic_block or (
+                    connection.vendor == "sqlite" and
+                    connection.is_in_memory_db()):
+                return False
+        return True
+
+    @staticmethod
+    async def run_sync(func, *args, concurrent=False):
+        """
+        function to call a sync function from the event loop. With concurrent,
+        it runs in its own thread with its own database connection, which is
+        closed afterwards like at the end of a request.
+
+        :param func: function: sync function, which may query the database
+        :param args: list: arguments of the function
+        :param concurrent: bool: run it outside the thread of the request
+        :return: result of the function
+        """
+        if not concurrent:
+            return await sync_to_async(func)(*args)
+
+        def closing():
+            try:
+                return func(*args)
+            finally:
+                close_old_connections()
+        return await sync_to_async(closing, thread_sensitive=False)()
+
+    async def acount_records(self, queryset, concurrent=False):
+        """
+        async version of 'count_records', the exact count uses the async ORM
+
+        :param queryset: Django Queryset: queryset to count
+        :param concurrent: bool: count in its own thread, see 'run_sync'
+        :return: tuple: number of the records and whether it's approximate
+        """
+        if self.Meta.count_strategy == "exact" and not concurrent:
+            return await self.route(queryset, "count").acount(), False
+        return await self.run_sync(self.count_records, queryset,
+                                   concurrent=concurrent)
+
+    async def atotal_count(self, queryset, pre_search_condition=None,
+                           concurrent=False):
+        """
+        async version of 'total_count'
+
+        :param queryset: Django Queryset: queryset after applying the pre
+          search condition
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param concurrent: bool: count in its own thread, see 'run_sync'
+        :return: tuple: number of the total records and whether it's
+          approximate
+        """
+        timeout = self.Meta.count_cache_timeout
+        if timeout is None:
+            return await self.acount_records(queryset, concurrent)
+        key = self.total_count_key(queryset, pre_search_condition)
+        total = await cache.aget(key)
+        if total is None:
+            total = await self.acount_records(queryset, concurrent)
+            await cache.aset(key, total, timeout)
+        return total
+
+    async def afetch_page(self, queryset, order_key, query_dict, dt_request,
+                          window=False, concurrent=False):
+        """
+        function to fetch the page of the filtered queryset with the async
+        ORM, the keyset pagination and the window count use their sync
+        functions
+
+        :param queryset: Django Queryset: filtered queryset
+        :param order_key: str: order key returned by 'get_order_key'
+        :param query_dict: dict: filter dictionary returned by 'get_query_dict'
+        :param dt_request: DataTablesRequest: parsed query dict
+        :param window: bool: fetch the number of the records together with
+          the page, see 'window_slicing'
+        :param concurrent: bool: fetch in its own thread, see 'run_sync'
+        :return: tuple: list of the records in the page, and the cursor
+          (keyset) or the number of the records (window) or None
+        """
+        if self.pagination == "keyset":
+            return await self.run_sync(self.keyset_slicing, queryset,
+                                       order_key, query_dict, dt_request,
+                                       concurrent=concurrent)
+        queryset = queryset.order_by(order_key)
+        if window:
+            return await self.run_sync(self.window_slicing, queryset,
+                                       dt_request, concurrent=concurrent)
+        queryset = self.slice_page(queryset, dt_request)
+        if concurrent:
+            return await self.run_sync(list, queryset, concurrent=True), None
+        return [item async for item in queryset], None
+
+    async def aquery_by_args(self, pre_search_condition=None, dt_request=None,
+                             **kwargs):
+        """
+        async version of 'query_by_args' built on the async ORM. The total
+        number, the number of the filtered records and the page are queried
+        at the same time, if 'use_concurrency' allows it.
+
+        :param pre_search_condition: None/OrderedDict: dictionary contains
+          filter conditions which should be processed before applying the filter
+          dictionary from user. None, if no pre_search_condition provided.
+        :param dt_request: None/QueryDict/DataTablesRequest: query dict sent by
+          data tables package, or its parsed result
+        :param kwargs: QueryDict: contains query parameters, used if
+          dt_request is None
+        :return: dict: contains total records number, list of the filtered
+          instances, size of this queryset and whether the numbers are
+          approximate
+        """
+        if pre_search_condition and not isinstance(pre_search_condition, OrderedDict):
+            raise TypeError(
+                "Parameter 'pre_search_condition' must be an OrderedDict.")
+        dt_request = ensure_request(dt_request, **kwargs)
+        query_dict = self.get_query_dict(dt_request)
+        order_key = self.get_order_key(dt_request)
+
+        projection = self.get_projection()
+        queryset = self.get_queryset(pre_search_condition)
+        concurrent = self.use_concurrency(queryset)
+        total_task = self.atotal_count(queryset, pre_search_condition,
+                                       concurrent)
+        if projection:
+            queryset = queryset.values(*projection.lookups)
+
+        search_value = dt_request.search.strip() \
+            if self.Meta.search_fields else ""
+        filtered = bool(query_dict or search_value)
+        if query_dict:
+            queryset = self.filtering(queryset, query_dict)
+        if search_value:
+            # the search queries whether the FTS5 table is built
+            queryset = await sync_to_async(self.searching)(queryset,
+                                                           search_value)
+        # the page is fetched from the database alias for fetching
+        fetch_queryset = self.route(queryset, "fetch")
+        window = filtered and self.use_window_count(fetch_queryset)
+        tasks = [total_task, self.afetch_page(fetch_queryset, order_key,
+                                              query_dict, dt_request, window,
+                                              concurrent)]
+        if filtered and not window:
+            tasks.append(self.acount_records(queryset, concurrent))
+        results = await asyncio.gather(*tasks)
+        (total, total_approximate), (items, extra) = results[:2]
+        if not filtered:
+            # without query the number of the filtered records is the total
+            # number
+            count, count_approximate = total, total_approximate
+        elif window:
+            count, count_approximate = extra, False
+            if count is None:
+                count, count_approximate = await self.acount_records(queryset)
+        else:
+            count, count_approximate = results[2]
+
+        result = {'items': items, 'count': count, 'total': total,
+                  'draw': dt_request.draw,
+                  'approximate': total_approximate or count_approximate}
+        if self.pagination == "keyset":
+            result['cursor'] = extra
+        return result
+
+    async def aprocess(self, pre_search_condition=None, dt_request=None,
+                       encoded=False, timing=None, **kwargs):
+        """
+        async version of 'process' for async views, see 'aquery_by_args'.
+        The records are serialized in a thread, since the serializer may
+        query the database.
+
+        :param pre_search_condition: None/OrderedDict: pre search condition to
+          be applied before applying the one getting from footer
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+          got from footer, e.g. request.POST, or its parsed result
+        :param encoded: bool: return the result encoded as json bytes
+        :param timing: None/Timing: collector of the stages' durations, None
+          creates a new one for this call
+        :param kwargs: dict: search parameters got from footer, used if
+          dt_request is None
+        :return: dict/bytes: same as 'process'
+        """
+        # each call measures its own stages, the queries run in other threads
+        # and aren't counted
+        if timing is None:
+            timing = self.get_timing()
+        result = await self._aprocess(pre_search_condition, dt_request,
+                                      timing, **kwargs)
+        if encoded:
+            with timing.stage("encode", count_queries=False):
+                return encode_json(result)
+        return result
+
+    async def _aprocess(self, pre_search_condition=None, dt_request=None,
+                        timing=NO_TIMING, **kwargs):
+        """
+        function to build the result of 'aprocess' as dictionary
+
+        :param pre_search_condition: None/OrderedDict: pre search condition
+        :param dt_request: None/QueryDict/DataTablesRequest: search parameters
+        :param timing: Timing/NoTiming: collector of the stages' durations
+        :param kwargs: dict: search parameters, used if dt_request is None
+        :return: dict
+        """
+        dt_request = ensure_request(dt_request, **kwargs)
+        # the cached result is shared by all the drawing numbers
+        timeout = self.Meta.response_cache_timeout
+        key = None
+        if timeout is not None:
+            key = self.response_cache_key(pre_search_condition, dt_request)
+            cached = await cache.aget(key)
+            if cached is not None:
+                return dict(cached, draw=dt_request.draw)
+        try:
+            with timing.stage("query", count_queries=False):
+                records = await self.aquery_by_args(
+                    pre_search_condition=pre_search_condition,
+                    dt_request=dt_request)
+        except SearchValueError as error:
+            # the invalid search value never reaches the database
+            return self.error_result(error, dt_request)
+        with timing.stage("serialize", count_queries=False):
+            if self.get_projection():
+                data = self.serialize(records['items'])
+            else:
+                data = await sync_to_async(self.serialize)(records['items'])
+        result = self.format_result(records, data)
+        if key is not None:
+            await cache.aset(key, dict(result, data=list(data)), timeout)
         return result
@@ -2,7 +2,13 @@
 Abstract form class to generating the choice fields dynamically
 according to the value of 'fields' defined in Meta class
 """
+from django.core.cache import cache
 from django.forms import forms
+from django.utils.translation import get_language
+from .utils.cache import (
+    KEY_PREFIX, bump_version, get_model_version, get_version, make_key,
+    track_model_versions
+)
 
 
 class AbstractFooterForm(forms.Form):
@@ -16,7 +22,28 @@ class AbstractFooterForm(forms.Form):
     should be in form of 'get_<field name>_choice>'. This class will
     automatically find the corresponding get choice function for each
     choice field.
+
+    The choices are fetched again for each instance, unless the Meta class
+    defines 'choices_cache_timeout', the number of seconds to keep them in
+    Django's cache. The cached choices are invalidated by 'invalidate_choices'
+    and by any change of the models listed in 'choices_models'.
     """
+    def __init_subclass__(cls, **kwargs):
+        """
+        used for checking the caching variables of the Meta class and for
+        tracking the changes of the models in 'choices_models'
+
+        :param kwargs: dict: keyword arguments
+        """
+        super(AbstractFooterForm, cls).__init_subclass__(**kwargs)
+        timeout = getattr(cls.Meta, "choices_cache_timeout", None)
+        if timeout is not None and (not isinstance(timeout, int) or
+                                    timeout < 0):
+            raise ValueError("'choices_cache_timeout' must be None or a "
+                             "non-negative integer.")
+        for model in getattr(cls.Meta, "choices_models", ()):
+            track_model_versions(model)
+
     def __new__(cls, *args, **kwargs):
         """
         used for checking the definition of the 'fields' variable in Meta
@@ -41,11 +68,74 @@ class AbstractFooterForm(forms.Form):
         """
         super(AbstractFooterForm, self).__init__(*args, **kwargs)
         for field_name, field_type in self.Meta.fields:
-            self.fields[field_name] = field_type(required=False, choices=getattr(self, 'get_'+field_name+'_choices'))
+            get_choices = getattr(self, 'get_'+field_name+'_choices')
+            if getattr(self.Meta, "choices_cache_timeout", None) is not None:
+                get_choices = self.cached_choices(field_name, get_choices)
+            self.fields[field_name] = field_type(required=False, choices=get_choices)
+
+    @classmethod
+    def choices_version_key(cls):
+        """
+        function to get the cache key of the generation counter, which is
+        bumped by 'invalidate_choices'
+
+        :return: str
+        """
+        return "%s:choices:%s.%s" % (KEY_PREFIX, cls.__module__,
+                                     cls.__qualname__)
+
+    @classmethod
+    def choices_version(cls):
+        """
+        function to get the current version of the choices: the generation
+        counter of the form and the ones of the models in 'choices_models'
+
+        :return: list of int
+        """
+        return [get_version(cls.choices_version_key())] + [
+            get_model_version(model)
+            for model in getattr(cls.Meta, "choices_models", ())]
+
+    @classmethod
+    def invalidate_choices(cls):
+        """
+        function to drop the cached choices of all the fields, e.g. after
+        changing the data they're built from with a queryset's update
+
+        :return: None
+        """
+        bump_version(cls.choices_version_key())
+
+    def cached_choices(self, field_name, get_choices):
+        """
+        function to wrap the get choice function of a field, such that the
+        choices are read from the cache. The choices are cached per form
+        class, field and language, they must not depend on the arguments of
+        the form instance.
+
+        :param field_name: str: name of the choice field
+        :param get_choices: function: get choice function of the field
+        :return: function
+        """
+        def get_cached_choices():
+            key = make_key("choices", type(self).__module__,
+                           type(self).__qualname__, field_name,
+                           self.choices_version(), get_language())
+            choices = cache.get(key)
+            if choices is None:
+                choices = list(get_choices())
+                cache.set(key, choices, self.Meta.choices_cache_timeout)
+            return choices
+        return get_cached_choices
 
     class Meta:
         """
         :param fields: list of tuples: the form should be:
             [("<field_name>", <forms.ChoiceField or forms.MultiChoiceField>), ]
+        :param choices_cache_timeout: None/int: optional, seconds to cache the
+            choices, None (default) disables the cache
+        :param choices_models: list of Django Model classes: optional, the
+            models the choices are built from, any change of them invalidates
+            the cached choices
         """
         fields = None
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+from ...datatables import DataTables
+
+
+class Command(BaseCommand):
+    help = ("Creates and fills the FTS5 tables of the global search on SQLite "
+            "('search_fts_table' in Meta class).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "datatables", nargs="+",
+            help="Dotted paths of the DataTables classes, e.g. "
+                 "'example.datatables.BookDataTables'.")
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS,
+            help="Database alias to write to, default: '%s'."
+                 % DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Drop and recreate the existing tables, e.g. after changing "
+                 "the search fields or after bulk changes.")
+
+    def handle(self, *args, **options):
+        for path in options["datatables"]:
+            try:
+                datatables_class = import_string(path)
+            except ImportError as error:
+                raise CommandError(str(error))
+            if not isinstance(datatables_class, type) or \
+                    not issubclass(datatables_class, DataTables):
+                raise CommandError("%r isn't a DataTables class." % path)
+            if not datatables_class.Meta.search_fts_table:
+                raise CommandError("Variable 'search_fts_table' isn't defined "
+                                   "in Meta class of %r." % path)
+            if options["rebuild"]:
+                datatables_class().rebuild_search_index(options["database"])
+            else:
+                datatables_class().build_search_index(options["database"])
+            self.stdout.write("%s: %s" % (path,
+                                          datatables_class.Meta.search_fts_table))
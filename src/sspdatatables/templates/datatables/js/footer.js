@@ -1,34 +1,55 @@
-{% load form_field %}
+{% load cache %}
 
 <script type="text/javascript" charset="utf-8">
 $(document).ready(function() {
-    {% for item in sspdtable.frame %}
-        {% with index=forloop.counter0 %}
-            {% if item.searchable %}
-                {% if item.footer_type == 'input' %}
-                    var content = '<input id="' + "{{sspdtable.id}}" + '_column_' + '{{index}}';
-                    content += '_search" type="text" class="form-control" placeholder="';
-                    {% if item.placeholder %}
-                        content += "{{item.placeholder}}";
-                    {% else %}
-                        content += "{{item.header}}";
-                    {% endif %};
-                    content += '" />';
-                {% else %}
-                    var content = '<{{item.footer_type}} id="';
-                    content += "{{sspdtable.id}}" + '_column_' + '{{index}}';
-                    content += '_search" class="form-control" name="';
-                    content += "{{item.header}}".toLowerCase()  + '" >';
-                    {% with field=sspdtable.footer_form|get_form_bound_field:item.id %}
-                        {% for choice in field %}
-                            content += '{{choice}}'
-                        {% endfor %}
-                    {% endwith %}
-                    content += '</{{item.footer_type}}>';
-                {% endif %}
-                $("#"+"{{sspdtable.id}}_{{item.id}}").html(content);
-            {% endif %}
-        {% endwith %}
-    {% endfor %}
+    {% if sspdtable.footer_cache_key %}
+        {% cache sspdtable.footer_cache_timeout sspdatatables_footer sspdtable.footer_cache_key %}
+            {% include 'datatables/js/footer_fields.js' %}
+        {% endcache %}
+    {% else %}
+        {% include 'datatables/js/footer_fields.js' %}
+    {% endif %}
+    {% if sspdtable.facets_url %}
+        // the options of the select footers with facets are loaded on first
+        // use, under the search conditions of the table's last request
+        var facet_selector = "#{{sspdtable.id}}_wrapper select[data-facet]";
+        $("#{{sspdtable.id}}").on("xhr.dt", function() {
+            $(facet_selector).data("facet-loaded", false);
+        });
+        $(document).on("focus mousedown", facet_selector, function() {
+            var select = $(this);
+            if (select.data("facet-loaded")) {
+                return;
+            }
+            select.data("facet-loaded", true);
+            var params = $("#{{sspdtable.id}}").DataTable().ajax.params() || {};
+            $.ajax({
+                "url": "{{sspdtable.facets_url}}",
+                "type": "POST",
+                "dataType": "json",
+                "headers": {
+                    'X-CSRFToken': $('[name=csrfmiddlewaretoken]').val(),
+                },
+                "data": $.extend({}, params, {"facet": select.data("facet")}),
+            }).done(function(json) {
+                if (json.error) {
+                    return;
+                }
+                var selected = select.val();
+                select.find("option").not(":first").remove();
+                $.each(json.values, function(i, facet) {
+                    var value = facet.value === null ? "" : String(facet.value);
+                    if (value === "") {
+                        return;
+                    }
+                    select.append($("<option>").val(value)
+                        .text(facet.label + " (" + facet.count + ")"));
+                });
+                select.val(selected);
+            }).fail(function() {
+                select.data("facet-loaded", false);
+            });
+        });
+    {% endif %}
 });
-</script>
\ No newline at end of file
+</script>
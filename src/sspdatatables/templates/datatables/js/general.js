@@ -19,26 +19,228 @@ String.prototype.capitalize = function() {
 };
 
 // apply the search in the footers
-// for the normal input footer, the user must hit the return key to trigger the search
-function apply_search(js_object) {
+// for the normal input footer, the user must hit the return key to trigger the search,
+// unless 'debounce' is given in the options: the number of milliseconds to wait
+// after the last key stroke before searching. A search value, which didn't change,
+// doesn't trigger a request.
+function apply_search(js_object, options) {
     var that = js_object;
+    var conf = $.extend({"debounce": 0}, options);
+    var timers = {};
+
+    function column_number(element) {
+        return parseInt($(element).attr('id').match(/_column_(\d+)_search$/)[1], 10);
+    }
+
+    function search(col_num, search_val) {
+        clearTimeout(timers[col_num]);
+        if (that.column( col_num ).search() === search_val) {
+            return;
+        }
+        that.columns( col_num )
+            .search( search_val )
+            .draw();
+    }
 
     $(js_object.table().container()).on('keypress', 'tfoot input', function(e) {
         if (e.which == 13) {
             e.preventDefault();
-            var col_num= $(this).attr('id').match(/\d+/g);
-            that.columns( col_num )
-                .search( this.value )
-                .draw();
+            search(column_number(this), this.value);
         }
     });
+    if (conf.debounce > 0) {
+        $(js_object.table().container()).on('input', 'tfoot input', function(e) {
+            var col_num = column_number(this);
+            var search_val = this.value;
+            clearTimeout(timers[col_num]);
+            timers[col_num] = setTimeout(function() {
+                search(col_num, search_val);
+            }, conf.debounce);
+        });
+    }
     $(js_object.table().container()).on('change', 'tfoot select', function(e) {
         e.preventDefault();
-        var col_num= $(this).attr('id').match(/\d+/g);
-        var search_val = $(this).val();
-        that.columns( col_num )
-            .search( search_val )
-            .draw();
+        search(column_number(this), $(this).val());
+    });
+}
+
+// request pipelining: each request fetches 'pages' pages at once, the
+// neighbouring pages are served from this block without a request, as long as
+// the search and the ordering don't change. A request still running, when the
+// next one starts, is aborted. Use it as the "ajax" option of the DataTable:
+//     "ajax": pipeline_ajax({
+//         "url": "/api/",
+//         "pages": 5,
+//         "headers": {'X-CSRFToken': $('[name=csrfmiddlewaretoken]').val()},
+//         "data": function(d) { return {"total_cols": 6}; },
+//     }),
+// options: url, type (default "POST"), pages (default 5), headers and data
+// (object or function of the parameters, its result extends them). Call
+// 'table.clearPipeline().draw(false)' to fetch the current page again, e.g.
+// after changing a record or for refreshing a dashboard. If the server sent
+// an ETag (see 'ensure_ajax_etag', "type": "GET"), the block is revalidated
+// with 'If-None-Match' and kept, if the server answers 304.
+function pipeline_ajax(options) {
+    var conf = $.extend({"type": "POST", "pages": 5, "headers": {}, "data": null}, options);
+    var block = null;
+    var xhr = null;
+
+    // the parameters, which select the same records in the same order
+    function block_key(request) {
+        var key = $.extend({}, request, {"draw": 0, "start": 0, "length": 0});
+        // the keyset cursor changes with each page
+        delete key.cursor;
+        return JSON.stringify(key);
+    }
+
+    function page_of(json, draw, start, length) {
+        var page = $.extend({}, json, {"draw": draw});
+        var offset = start - block.start;
+        page.data = length < 0 ? json.data.slice(offset) :
+            json.data.slice(offset, offset + length);
+        return page;
+    }
+
+    return function(request, draw_callback, settings) {
+        var start = request.start;
+        var length = request.length;
+        var key = block_key(request);
+        if (settings.clearPipeline) {
+            settings.clearPipeline = false;
+            if (block !== null) {
+                block.stale = true;
+            }
+        }
+
+        if (block !== null && !block.stale && block.key === key && length >= 0 &&
+                start >= block.start &&
+                (start + length <= block.end ||
+                 block.end >= block.json.recordsFiltered)) {
+            draw_callback(page_of(block.json, request.draw, start, length));
+            return;
+        }
+
+        if (xhr !== null) {
+            xhr.abort();
+        }
+        var request_start = start;
+        if (block !== null && block.key === key && start < block.start) {
+            // paging backwards, prefetch the previous pages
+            request_start = Math.max(0, start - length * (conf.pages - 1));
+        } else if (block !== null && block.stale && block.key === key &&
+                start < block.end) {
+            // the page of a stale block, fetch the whole block again
+            request_start = block.start;
+        }
+        var data = $.extend({}, request, {
+            "start": request_start,
+            "length": length < 0 ? length : length * conf.pages,
+        });
+        if (typeof conf.data === "function") {
+            $.extend(data, conf.data(data));
+        } else if (conf.data) {
+            $.extend(data, conf.data);
+        }
+        // the same block is only downloaded again, if it changed. The server
+        // only answers GET requests with 304, the others with 412.
+        var revalidated = conf.type.toUpperCase() === "GET" &&
+            block !== null && block.etag && block.key === key &&
+            block.start === request_start && block.length === data.length;
+        var headers = $.extend({}, conf.headers);
+        if (revalidated) {
+            headers["If-None-Match"] = block.etag;
+        }
+
+        xhr = $.ajax({
+            "url": conf.url,
+            "type": conf.type,
+            "headers": headers,
+            "data": data,
+            "dataType": "json",
+            "cache": false,
+        }).done(function(json, status, jq_xhr) {
+            xhr = null;
+            if (jq_xhr.status === 304 && revalidated) {
+                block.stale = false;
+                draw_callback(page_of(block.json, request.draw, start, length));
+                return;
+            }
+            if (json.error) {
+                block = null;
+                draw_callback($.extend({}, json, {"draw": request.draw}));
+                return;
+            }
+            block = {"key": key, "start": request_start, "length": data.length,
+                     "end": request_start + json.data.length, "json": json,
+                     "etag": jq_xhr.getResponseHeader("ETag"), "stale": false};
+            draw_callback(page_of(json, request.draw, start, length));
+        }).fail(function(jq_xhr, status, error) {
+            xhr = null;
+            if (status !== "abort") {
+                block = null;
+                draw_callback({"draw": request.draw, "error": error || status,
+                               "data": [], "recordsTotal": 0, "recordsFiltered": 0});
+            }
+        });
+    };
+}
+
+if ($.fn.dataTable) {
+    $.fn.dataTable.Api.register('clearPipeline()', function() {
+        return this.iterator('table', function(settings) {
+            settings.clearPipeline = true;
+        });
+    });
+}
+
+// first page processed by the server ('get_table_frame' with 'first_page'):
+// the first request of the table is answered with the page embedded into the
+// page as JSON, if it asks for the same records (no search, the default order
+// and the same length), such that the table is shown without a request and the
+// cells are rendered by the columns' render functions as usual. The other
+// requests are passed to the wrapped "ajax" option:
+//     "ajax": first_page_ajax("#sspdtable", pipeline_ajax({...})),
+function first_page_ajax(table_selector, ajax) {
+    var node = $(table_selector + "_first_page");
+    var first_page = node.length ? JSON.parse(node.text()) : null;
+
+    function is_first_page(request, page) {
+        var searched = request.search && request.search.value;
+        $.each(request.columns || [], function(i, column) {
+            searched = searched || (column.search && column.search.value);
+        });
+        var order = request.order || [];
+        return !searched && request.start === 0 &&
+            request.length === page.length &&
+            (order.length === 0 || (order.length === 1 &&
+             parseInt(order[0].column, 10) === page.order[0] &&
+             order[0].dir === page.order[1]));
+    }
+
+    return function(request, draw_callback, settings) {
+        // only the first request can be answered with it
+        var page = first_page;
+        first_page = null;
+        if (page !== null && is_first_page(request, page)) {
+            draw_callback($.extend({}, page.result, {"draw": request.draw}));
+            return;
+        }
+        return ajax.call(this, request, draw_callback, settings);
+    };
+}
+
+// keyset pagination (Meta.pagination = 'keyset'): keep the cursor returned
+// with the last drawn page and send it with the next request, such that the
+// server can seek from the page boundary instead of using an offset
+function keyset_pagination(js_object) {
+    // the cursor of the first page rendered by the server
+    var cursor = $(js_object.table().node()).data("cursor") || "";
+
+    js_object.on('xhr.dt', function(e, settings, json) {
+        cursor = (json && json.cursor) ? json.cursor : "";
+    });
+    js_object.on('preXhr.dt', function(e, settings, data) {
+        data.cursor = cursor;
     });
 }
 </script>
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Module to hold the functionality for caching the results of the DataTables in
+Django's cache framework. The cached values are invalidated through per-model
+generation counters, which are bumped by the signals post_save and post_delete.
+"""
+import time
+from collections import OrderedDict
+from hashlib import md5
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import post_save, post_delete
+from typing import Any, Optional
+
+
+KEY_PREFIX = "sspdatatables"
+
+
+def version_key(model) -> str:
+    """
+    Returns the cache key of the generation counter of the given model
+
+    :param model: Django Model class
+    :return: str
+    """
+    return "%s:version:%s" % (KEY_PREFIX, model._meta.label_lower)
+
+
+def versions_shared() -> bool:
+    """
+    Checks if the generation counters are kept in a cache shared by all the
+    processes. The counters in DummyCache are never kept, the ones in
+    LocMemCache are only bumped in the process, which changed the records.
+
+    :return: bool
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS],
+                          (DummyCache, LocMemCache))
+
+
+def get_version(key: str) -> Optional[int]:
+    """
+    Returns the current value of the generation counter stored under the
+    given key. A missing counter is initialized with the current time in
+    milliseconds, such that a counter lost from the cache never restarts with
+    an old value.
+
+    :param key: str: cache key of the counter
+    :return: None/int: None if the cache doesn't keep the counter, e.g.
+      DummyCache
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key: str) -> None:
+    """
+    Increases the generation counter stored under the given key, all the
+    cached values built with the old counter won't be found any more.
+
+    :param key: str: cache key of the counter
+    :return: None
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the counter doesn't exist (any more)
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_model_version(model) -> Optional[int]:
+    """
+    Returns the current generation counter of the given model
+
+    :param model: Django Model class
+    :return: int
+    """
+    return get_version(version_key(model))
+
+
+def bump_model_version(model) -> None:
+    """
+    Increases the generation counter of the given model, all the cached values
+    built with the old counter won't be found any more.
+
+    :param model: Django Model class
+    :return: None
+    """
+    bump_version(version_key(model))
+
+
+def _bump_sender_version(sender, **kwargs) -> None:
+    """
+    Signal receiver for post_save and post_delete
+
+    :param sender: Django Model class
+    :param kwargs: dict: signal arguments
+    :return: None
+    """
+    bump_model_version(sender)
+
+
+def track_model_versions(model) -> None:
+    """
+    Connects the signals post_save and post_delete of the given model, such
+    that its generation counter is bumped after each change. It can be called
+    multiple times for the same model.
+    Notice: queryset's 'update', 'bulk_create' and raw sql don't send these
+    signals, call 'bump_model_version' after using them.
+
+    :param model: Django Model class
+    :return: None
+    """
+    dispatch_uid = "%s:%s" % (KEY_PREFIX, model._meta.label_lower)
+    post_save.connect(_bump_sender_version, sender=model, weak=False,
+                      dispatch_uid=dispatch_uid)
+    post_delete.connect(_bump_sender_version, sender=model, weak=False,
+                        dispatch_uid=dispatch_uid)
+
+
+def normalize(value: Any) -> Any:
+    """
+    Converts the given value into a stable representation, which can be used
+    for building the cache key. The order of the items in a dict doesn't
+    matter, in an OrderedDict and a list it does.
+
+    :param value: different values: e.g. the pre search condition
+    :return: stable representation of the value
+    """
+    if isinstance(value, OrderedDict):
+        return [(k, normalize(v)) for k, v in value.items()]
+    elif isinstance(value, dict):
+        return sorted((str(k), normalize(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return repr(value)
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Builds the cache key from the given parts
+
+    :param parts: different values: parts of the key
+    :return: str
+    """
+    digest = md5(repr(normalize(parts)).encode("utf-8")).hexdigest()
+    return "%s:%s" % (KEY_PREFIX, digest)
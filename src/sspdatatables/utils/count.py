@@ -0,0 +1,110 @@
+"""
+Module to hold the strategies for counting the records of a queryset. Each
+strategy returns the number of records together with a flag showing whether
+the number is approximate.
+"""
+import json
+from django.db import connections
+from typing import Optional, Tuple
+
+
+def exact_count(queryset, limit: int) -> Tuple[int, bool]:
+    """
+    Counts all the records in the queryset, the limit is not used
+
+    :param queryset: Django Queryset: queryset to count
+    :param limit: int: not used
+    :return: tuple: number of records and False
+    """
+    return queryset.count(), False
+
+
+def capped_count(queryset, limit: int) -> Tuple[int, bool]:
+    """
+    Counts the records in the queryset up to the limit, the database stops
+    scanning after finding enough records
+
+    :param queryset: Django Queryset: queryset to count
+    :param limit: int: maximum number of records to count
+    :return: tuple: number of records and whether the limit is reached
+    """
+    count = queryset.order_by()[:limit].count()
+    return count, count >= limit
+
+
+def _postgresql_estimate(queryset, connection) -> Optional[int]:
+    """
+    Reads the estimated number of rows from the planner of PostgreSQL. For a
+    queryset without filter it uses the statistics in pg_class, otherwise the
+    plan of the query.
+
+    :param queryset: Django Queryset: queryset to estimate
+    :param connection: database connection
+    :return: None/int: estimated number of rows
+    """
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            table = connection.ops.quote_name(queryset.model._meta.db_table)
+            cursor.execute("SELECT reltuples FROM pg_class "
+                           "WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            # reltuples is -1 (or 0 in old versions), if the table was never
+            # analyzed
+            return int(row[0]) if row and row[0] > 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _sqlite_estimate(queryset, connection) -> Optional[int]:
+    """
+    Reads the number of rows stored by SQLite's ANALYZE command in the table
+    sqlite_stat1. SQLite doesn't estimate filtered queries.
+
+    :param queryset: Django Queryset: queryset to estimate
+    :param connection: database connection
+    :return: None/int: estimated number of rows
+    """
+    if queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master "
+                       "WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+                       [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+def estimated_count(queryset, limit: int) -> Tuple[int, bool]:
+    """
+    Uses the row estimate of the database planner (PostgreSQL and SQLite).
+    If no estimate is available or the estimate is smaller than the limit,
+    the records are counted exactly.
+
+    :param queryset: Django Queryset: queryset to estimate
+    :param limit: int: estimates below it are replaced by the exact number
+    :return: tuple: number of records and whether it's approximate
+    """
+    connection = connections[queryset.db]
+    estimate = None
+    if connection.vendor == "postgresql":
+        estimate = _postgresql_estimate(queryset, connection)
+    elif connection.vendor == "sqlite":
+        estimate = _sqlite_estimate(queryset, connection)
+    if estimate is None or estimate < limit:
+        return exact_count(queryset, limit)
+    return estimate, True
+
+
+COUNT_STRATEGIES = {
+    "exact": exact_count,
+    "capped": capped_count,
+    "estimated": estimated_count,
+}
+"""available count strategies, the key is used in DataTables' Meta class"""
@@ -2,13 +2,56 @@
 Module defines the decorator for checking the request passed to the Django views
 function is ajax request and its request method is as expected
 """
-from django.http import JsonResponse, HttpRequest
+import inspect
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from .cache import versions_shared
+from .encoder import encode_json
+
+
+def is_ajax(request):
+    """
+    Checks if the request is sent by XMLHttpRequest, which replaces the
+    request's 'is_ajax' function removed in Django 4.0
+
+    :param request: HttpRequest
+    :return: bool
+    """
+    return request.META.get("HTTP_X_REQUESTED_WITH") == "XMLHttpRequest"
+
+
+def check_request(request, valid_request_methods, error_response_context=None):
+    """
+    Checks if the request is an ajax request with one of the valid request
+    methods
+
+    :param request: HttpRequest
+    :param valid_request_methods: list: list of valid request methods, such as
+      'GET', 'POST'
+    :param error_response_context: None/dict: context dictionary to render, if
+      error occurs
+    :return: None/HttpResponse: None if the request is valid, otherwise the
+      error response
+    """
+    if not isinstance(request, HttpRequest):
+        # make sure the request is a django httprequest
+        return generate_error_json_response("Invalid request!",
+                                            error_response_context)
+    elif not is_ajax(request):
+        # ensure the request is an ajax request
+        return generate_error_json_response("Invalid request type!",
+                                            error_response_context)
+    elif request.method not in valid_request_methods:
+        # check if the request method is in allowed request methods
+        return generate_error_json_response("Invalid request method!",
+                                            error_response_context)
+    return None
 
 
 def ensure_ajax(valid_request_methods, error_response_context=None):
     """
     Intends to ensure the received the request is ajax request and it is
-    included in the valid request methods
+    included in the valid request methods. It supports sync and async views.
 
     :param valid_request_methods: list: list of valid request methods, such as
       'GET', 'POST'
@@ -17,20 +60,19 @@ def ensure_ajax(valid_request_methods, error_response_context=None):
     :return: function
     """
     def real_decorator(view_func):
-        def wrap_func(request, *args, **kwargs):
-            if not isinstance(request, HttpRequest):
-                # make sure the request is a django httprequest
-                return generate_error_json_response("Invalid request!",
-                                                    error_response_context)
-            elif not request.is_ajax():
-                # ensure the request is an ajax request
-                return generate_error_json_response("Invalid request type!",
-                                                    error_response_context)
-            elif request.method not in valid_request_methods:
-                # check if the request method is in allowed request methods
-                return generate_error_json_response("Invalid request method!",
-                                                    error_response_context)
-            else:
+        if inspect.iscoroutinefunction(view_func):
+            async def wrap_func(request, *args, **kwargs):
+                error_response = check_request(request, valid_request_methods,
+                                               error_response_context)
+                if error_response is not None:
+                    return error_response
+                return await view_func(request, *args, **kwargs)
+        else:
+            def wrap_func(request, *args, **kwargs):
+                error_response = check_request(request, valid_request_methods,
+                                               error_response_context)
+                if error_response is not None:
+                    return error_response
                 return view_func(request, *args, **kwargs)
         wrap_func.__doc__ = view_func.__doc__
         wrap_func.__name__ = view_func.__name__
@@ -38,15 +80,110 @@ def ensure_ajax(valid_request_methods, error_response_context=None):
     return real_decorator
 
 
+def get_etag(etag, request, *args, **kwargs):
+    """
+    Builds the ETag of the response to the request
+
+    :param etag: DataTables class/function: the DataTables class processing
+      the request (its 'etag' with the request's parameters), or a function
+      getting the view's arguments and returning the ETag
+    :param request: HttpRequest
+    :param args: list: arguments of the view
+    :param kwargs: dict: keyword arguments of the view
+    :return: None/str: ETag, None if it isn't known or the request isn't
+      a GET or HEAD request
+    """
+    # a matching 'If-None-Match' is answered with 412 for the other methods.
+    # The versions in a cache, which isn't shared by all the processes, miss
+    # the changes in the other processes, the ETag would never change.
+    if request.method not in {"GET", "HEAD"} or not versions_shared():
+        return None
+    if inspect.isclass(etag):
+        return etag().etag(dt_request=request.GET)
+    return etag(request, *args, **kwargs)
+
+
+def set_etag(response, etag):
+    """
+    Adds the ETag to a successful response, the browser must revalidate it
+    before using it again
+
+    :param response: HttpResponse
+    :param etag: None/str: ETag
+    :return: HttpResponse
+    """
+    if etag and response.status_code == 200 and not response.has_header("ETag"):
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def ensure_ajax_etag(valid_request_methods, etag, error_response_context=None):
+    """
+    Works like 'ensure_ajax' and supports conditional requests: the response
+    to a GET (or HEAD) request gets a weak ETag built from the versions of the
+    involved models and the request's parameters (without drawing number). A
+    request with a matching 'If-None-Match' is answered with 304 without
+    calling the view, i.e. without any query for the page. The other request
+    methods are passed to the view as by 'ensure_ajax'.
+    Notice: the ETag only changes with the changes sent by the signals
+    post_save and post_delete, see 'utils.cache.track_model_versions'. The
+    versions must be kept in a cache shared by all the processes (e.g.
+    Memcached, Redis or the database), with DummyCache or LocMemCache as
+    default cache no ETag is added.
+
+    :param valid_request_methods: list: list of valid request methods, such as
+      'GET', 'POST'
+    :param etag: DataTables class/function: the DataTables class processing
+      the request, or a function getting the view's arguments and returning
+      the ETag, e.g. for a pre search condition depending on the user
+    :param error_response_context: None/dict: context dictionary to render, if
+      error occurs
+    :return: function
+    """
+    def real_decorator(view_func):
+        if inspect.iscoroutinefunction(view_func):
+            async def wrap_func(request, *args, **kwargs):
+                error_response = check_request(request, valid_request_methods,
+                                               error_response_context)
+                if error_response is not None:
+                    return error_response
+                tag = get_etag(etag, request, *args, **kwargs)
+                response = None
+                if tag is not None:
+                    response = get_conditional_response(request, etag=tag)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return set_etag(response, tag)
+        else:
+            def wrap_func(request, *args, **kwargs):
+                error_response = check_request(request, valid_request_methods,
+                                               error_response_context)
+                if error_response is not None:
+                    return error_response
+                tag = get_etag(etag, request, *args, **kwargs)
+                response = None
+                if tag is not None:
+                    response = get_conditional_response(request, etag=tag)
+                if response is None:
+                    response = view_func(request, *args, **kwargs)
+                return set_etag(response, tag)
+        wrap_func.__doc__ = view_func.__doc__
+        wrap_func.__name__ = view_func.__name__
+        return wrap_func
+    return real_decorator
+
+
 def generate_error_json_response(error_dict, error_response_context=None):
     """
     Intends to build an error json response. If the error_response_context is
-    None, then we generate this response using data tables format
+    None, then we generate this response using data tables format. The values
+    in the error_dict (e.g. the drawing number) are kept.
 
     :param error_dict: str/dict: contains the error message(s)
     :param error_response_context: None/dict: context dictionary to render, if
       error occurs
-    :return: JsonResponse
+    :return: HttpResponse: json response
     """
     response = error_dict
     if isinstance(error_dict, str):
@@ -55,17 +192,37 @@ def generate_error_json_response(error_dict, error_response_context=None):
         error_response_context = {
             'draw': 0, 'recordsTotal': 0, 'recordsFiltered': 0, 'data': []
         }
-    response.update(error_response_context)
-    return JsonResponse(response)
+    for key, value in error_response_context.items():
+        response.setdefault(key, value)
+    return HttpResponse(encode_json(response),
+                        content_type="application/json")
 
-def dt_json_response(context):
+def dt_json_response(context, encoder=None, timing=None):
     """
     render the context in a json response. It the context contains error messages,
-    render an error json response.
+    render an error json response. The context can also be already encoded,
+    e.g. by 'process' with 'encoded=True'.
 
-    :param context: dict: json serializable dictionary
-    :return: JsonResponse
+    :param context: dict/bytes: json serializable dictionary, or its json
+      encoded bytes
+    :param encoder: None/str/function: json encoder, None means the setting
+      'SSPDATATABLES_JSON_ENCODER', see 'utils.encoder.get_encoder'
+    :param timing: None/Timing: measured stages (e.g. the one passed to
+      'process'), the encoding is added and all the stages are rendered in
+      the header 'Server-Timing'
+    :return: HttpResponse: json response
     """
-    if "error" in context:
-        return generate_error_json_response(context)
-    return JsonResponse(context)
\ No newline at end of file
+    if isinstance(context, bytes):
+        response = HttpResponse(context, content_type="application/json")
+    elif "error" in context:
+        response = generate_error_json_response(context)
+    elif timing is not None:
+        with timing.stage("encode", count_queries=False):
+            response = HttpResponse(encode_json(context, encoder),
+                                    content_type="application/json")
+    else:
+        response = HttpResponse(encode_json(context, encoder),
+                                content_type="application/json")
+    if timing is not None and timing.stages:
+        response["Server-Timing"] = timing.header()
+    return response
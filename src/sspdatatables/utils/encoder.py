@@ -0,0 +1,137 @@
+"""
+Module to hold the functionality for encoding the responses into json. The
+encoder is chosen by the setting 'SSPDATATABLES_JSON_ENCODER':
+* 'auto' (default): orjson if it's installed, otherwise ujson, otherwise the
+  standard library
+* 'orjson', 'ujson' or 'json': the given one
+* a callable, which encodes an object into bytes
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _default(obj: Any) -> Any:
+    """
+    Converts the objects not supported by orjson into json serializable ones,
+    in the same way as django's json encoder
+
+    :param obj: object to convert, e.g. Decimal, lazy translation
+    :return: json serializable object
+    """
+    if isinstance(obj, (Decimal, Promise)):
+        return str(obj)
+    if isinstance(obj, timedelta):
+        return duration_iso_string(obj)
+    return _django_encoder.default(obj)
+
+
+def _ujson_default(obj: Any) -> Any:
+    """
+    Converts the objects not supported by ujson into json serializable ones
+
+    :param obj: object to convert, e.g. date, Decimal, UUID
+    :return: json serializable object
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    return _default(obj)
+
+
+def orjson_dumps(obj: Any) -> bytes:
+    """
+    Encodes the object with orjson
+
+    :param obj: json serializable object
+    :return: bytes
+    """
+    return orjson.dumps(obj, default=_default,
+                        option=orjson.OPT_NON_STR_KEYS)
+
+
+def ujson_dumps(obj: Any) -> bytes:
+    """
+    Encodes the object with ujson
+
+    :param obj: json serializable object
+    :return: bytes
+    """
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                       default=_ujson_default).encode("utf-8")
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Encodes the object with the standard library's json and django's json
+    encoder
+
+    :param obj: json serializable object
+    :return: bytes
+    """
+    return json.dumps(obj, cls=DjangoJSONEncoder,
+                      separators=(",", ":")).encode("utf-8")
+
+
+ENCODERS = {
+    "orjson": (orjson, orjson_dumps),
+    "ujson": (ujson, ujson_dumps),
+    "json": (json, json_dumps),
+}
+"""available encoders: the module and the function encoding into bytes"""
+
+
+def get_encoder(name: Any = None) -> Callable[[Any], bytes]:
+    """
+    Returns the function encoding an object into json bytes
+
+    :param name: None/str/function: name of the encoder, a function is
+      returned directly. None means the setting 'SSPDATATABLES_JSON_ENCODER'.
+    :return: function
+    """
+    if name is None:
+        name = getattr(settings, "SSPDATATABLES_JSON_ENCODER", "auto")
+    if callable(name):
+        return name
+    if name == "auto":
+        for module, dumps in ENCODERS.values():
+            if module is not None:
+                return dumps
+    if name not in ENCODERS:
+        raise ValueError("JSON encoder must be one of %r, 'auto' or a "
+                         "function." % sorted(ENCODERS))
+    module, dumps = ENCODERS[name]
+    if module is None:
+        raise ImportError("JSON encoder %r isn't installed." % name)
+    return dumps
+
+
+def encode_json(obj: Any, encoder: Any = None) -> bytes:
+    """
+    Encodes the object into json bytes with the given or configured encoder
+
+    :param obj: json serializable object
+    :param encoder: None/str/function: see 'get_encoder'
+    :return: bytes
+    """
+    return get_encoder(encoder)(obj)
@@ -16,6 +16,9 @@ class ExtendedEnumMeta(EnumMeta):
       enumerations of the same Enumeration class
     2. returns the enumeration according to the given value of the specific
       attr_name
+    Both of them read the results built once when the class is created: a
+    tuple of the values and a dict index from value to enumeration for each
+    attr_name.
     """
     def __new__(mcs, name: str, bases: Tuple[type, ...],
                 namespace: Dict[str, Any]) -> type:
@@ -32,6 +35,22 @@ class ExtendedEnumMeta(EnumMeta):
         :return: class object
         """
         cls = super().__new__(mcs, name, bases, namespace)
+        members = list(cls)
+        cls._attr_values_ = {}
+        cls._attr_indexes_ = {}
+        cls._attr_unhashable_ = set()
+        for attr_name in cls.attr_names():
+            values = tuple(getattr(member, attr_name) for member in members)
+            index = {}
+            for member, value in zip(members, values):
+                try:
+                    # keep the first enumeration for duplicate values
+                    index.setdefault(value, member)
+                except TypeError:
+                    # unhashable value, it's found by the linear search
+                    cls._attr_unhashable_.add(attr_name)
+            cls._attr_values_[attr_name] = values
+            cls._attr_indexes_[attr_name] = index
         func_name_and_doc = [
             ("%ss",
              "Collective function to return the values of the attribute %s from"
@@ -59,7 +78,7 @@ class ExtendedEnumMeta(EnumMeta):
 
         :return: tuple of different types
         """
-        return tuple(map(lambda x: getattr(x, attr_name), list(cls)))
+        return cls._attr_values_[attr_name]
 
     @classmethod
     def _from_attr_(mcs, cls, attr_name: str, attr_value: Any) -> TypeVar:
@@ -71,6 +90,13 @@ class ExtendedEnumMeta(EnumMeta):
         :param attr_value: different values: key to search for
         :return: Enumeration Item
         """
+        if attr_name not in cls._attr_unhashable_:
+            try:
+                return cls._attr_indexes_[attr_name].get(attr_value)
+            except TypeError:
+                # unhashable value can't be in the index
+                return None
+        # some values are unhashable, fall back to the linear search
         return next(iter(filter(lambda x: getattr(x, attr_name) == attr_value,
                                 list(cls))), None)
 
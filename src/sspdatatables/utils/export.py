@@ -0,0 +1,70 @@
+"""
+Module to hold the functionality for streaming the records of a DataTables
+class as CSV or NDJSON file with bounded memory.
+"""
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+class Echo:
+    """
+    Pseudo buffer for the csv writer, the written line is returned directly
+    instead of being stored
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def get_value(data: Dict[str, Any], serializer_key: str) -> Any:
+    """
+    Reads the value of the dotted serializer key from the serialized data
+
+    :param data: dict: serialized record
+    :param serializer_key: str: dotted key defined in frame
+    :return: value, None if one of the keys is missing
+    """
+    for key in serializer_key.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def csv_stream(frame: List[Dict[str, Any]],
+               rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Generates the lines of the csv file: the headers of the columns in frame
+    having a serializer key, followed by one line per record
+
+    :param frame: list of dict: frame defined in Meta class
+    :param rows: iterable of dict: serialized records
+    :return: generator of str
+    """
+    columns = [item for item in frame if item["serializer_key"]]
+    writer = csv.writer(Echo())
+    yield writer.writerow([item["header"] for item in columns])
+    for row in rows:
+        yield writer.writerow([get_value(row, item["serializer_key"])
+                               for item in columns])
+
+
+def ndjson_stream(frame: List[Dict[str, Any]],
+                  rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Generates the lines of the ndjson file, one serialized record per line
+
+    :param frame: list of dict: frame defined in Meta class, not used
+    :param rows: iterable of dict: serialized records
+    :return: generator of str
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", csv_stream),
+    "ndjson": ("application/x-ndjson", ndjson_stream),
+}
+"""available export formats: content type and stream generator"""
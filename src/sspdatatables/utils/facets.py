@@ -0,0 +1,73 @@
+"""
+Module to hold the functionality for counting the distinct values of a column
+(facets) in a single grouped query, e.g. for the options of a select footer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count
+from typing import Any, Dict, List, Optional, Tuple
+
+
+FACET_COUNT = "facet_count"
+"""name of the annotation holding the number of records per value"""
+
+
+def resolve_field(model, lookup: str) -> Optional[Any]:
+    """
+    Resolves the model field of a lookup, e.g. 'author__nationality' is
+    resolved to the field 'nationality' of the model 'Author'
+
+    :param model: Django Model class: model to start with
+    :param lookup: str: lookup of a field
+    :return: None/Django Field: None, if the lookup isn't a field
+    """
+    field = None
+    for part in lookup.split("__"):
+        if field is not None:
+            if not field.is_relation or field.related_model is None:
+                return None
+            model = field.related_model
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+    return field
+
+
+def facet_counts(queryset, lookup: str,
+                 limit: int) -> Tuple[List[Tuple[Any, int]], bool]:
+    """
+    Counts the records per distinct value of the lookup in one grouped query,
+    the most frequent values first
+
+    :param queryset: Django Queryset: filtered queryset
+    :param lookup: str: lookup of the field to group by
+    :param limit: int: maximum number of values
+    :return: tuple: list of tuples (value, number of records) and whether
+      there are more values than the limit
+    """
+    rows = list(queryset.order_by()
+                .values(lookup)
+                .annotate(**{FACET_COUNT: Count("pk")})
+                .order_by("-" + FACET_COUNT, lookup)
+                .values_list(lookup, FACET_COUNT)[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def label_facets(model, lookup: str,
+                 rows: List[Tuple[Any, int]]) -> List[Dict[str, Any]]:
+    """
+    Adds the display label to the counted values, which is the label of the
+    field's choices if it has any, otherwise the value itself
+
+    :param model: Django Model class: model the lookup starts with
+    :param lookup: str: lookup of the counted field
+    :param rows: list of tuples: values and their numbers of records
+    :return: list of dict: value, label and count
+    """
+    field = resolve_field(model, lookup)
+    labels = dict(field.flatchoices) if field is not None and \
+        field.choices else {}
+    return [{"value": value,
+             "label": "" if value is None else str(labels.get(value, value)),
+             "count": count}
+            for value, count in rows]
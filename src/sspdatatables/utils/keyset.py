@@ -0,0 +1,220 @@
+"""
+Module to hold the functionality for the keyset (seek) pagination, which
+replaces the LIMIT/OFFSET slicing by filtering on the boundary values of the
+neighbouring page.
+"""
+import datetime
+import json
+from hashlib import md5
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from typing import Any, Dict, List, Optional, Tuple
+
+
+KEYSET_ANNOTATION = "dt_keyset_%d"
+"""name of the annotations holding the ordering values of each row"""
+
+CURSOR_SALT = "sspdatatables.keyset"
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Django's json encoder keeping the microseconds of datetime and time,
+    which it cuts to milliseconds otherwise, such that the boundary values
+    of a page are sought exactly
+    """
+    def default(self, o: Any) -> Any:
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer:
+    """
+    Compact json serializer for the signed cursor, it supports the data types
+    of django's json encoder (date, datetime, Decimal, UUID ...)
+    """
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"),
+                          cls=CursorEncoder).encode("latin-1")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data.decode("latin-1"))
+
+
+def get_ordering(order_key: str, pk_name: str = "pk") -> List[Tuple[str, bool]]:
+    """
+    Builds the complete ordering for the seek filter, the primary key is
+    appended as tie-breaker, such that the ordering is deterministic
+
+    :param order_key: str: order key, which is returned by 'get_order_key'
+    :param pk_name: str: name of the primary key
+    :return: list of tuples: (field name, descending or not)
+    """
+    descending = order_key.startswith("-")
+    field_name = order_key.lstrip("-")
+    ordering = [(field_name, descending)]
+    if field_name not in {pk_name, "pk"}:
+        ordering.append((pk_name, descending))
+    return ordering
+
+
+def is_nullable(model, lookup: str) -> bool:
+    """
+    Checks if the values of the lookup can be null: the field or one of the
+    relations on its way is nullable, or a reverse relation is on its way
+    (joined with LEFT OUTER JOIN). An unknown lookup (e.g. an annotation) is
+    regarded as nullable.
+
+    :param model: Django Model class: model to start with
+    :param lookup: str: lookup of a field, e.g. 'author__name'
+    :return: bool
+    """
+    if lookup == "pk":
+        return False
+    for part in lookup.split("__"):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return True
+        if getattr(field, "null", False) or field.one_to_many or \
+                field.many_to_many or not field.concrete:
+            return True
+        if field.is_relation:
+            model = field.related_model
+    return False
+
+
+def seekable(model, ordering: List[Tuple[str, bool]]) -> bool:
+    """
+    Checks if the rows can be sought in the ordering: the seek condition's
+    comparisons never match null, so the rows having null in an ordering
+    field would be skipped
+
+    :param model: Django Model class
+    :param ordering: list of tuples: result of 'get_ordering'
+    :return: bool
+    """
+    return not any(is_nullable(model, field_name)
+                   for field_name, _ in ordering)
+
+
+def order_by_args(ordering: List[Tuple[str, bool]],
+                  reverse: bool = False) -> List[str]:
+    """
+    Converts the ordering into the arguments of queryset's order_by function
+
+    :param ordering: list of tuples: result of 'get_ordering'
+    :param reverse: bool: reverse the ordering, used for seeking backwards
+    :return: list of str
+    """
+    return [("-" if descending != reverse else "") + field_name
+            for field_name, descending in ordering]
+
+
+def annotations(ordering: List[Tuple[str, bool]]) -> Dict[str, F]:
+    """
+    Builds the annotations to read the ordering values of each row
+
+    :param ordering: list of tuples: result of 'get_ordering'
+    :return: dict: keyword arguments for queryset's annotate function
+    """
+    return {KEYSET_ANNOTATION % i: F(field_name)
+            for i, (field_name, _) in enumerate(ordering)}
+
+
+def boundary_values(item: Any, ordering: List[Tuple[str, bool]]) -> list:
+    """
+    Reads the ordering values from an annotated row
+
+    :param item: model instance/dict: row fetched with the 'annotations'
+    :param ordering: list of tuples: result of 'get_ordering'
+    :return: list of values
+    """
+    if isinstance(item, dict):
+        return [item[KEYSET_ANNOTATION % i] for i in range(len(ordering))]
+    return [getattr(item, KEYSET_ANNOTATION % i) for i in range(len(ordering))]
+
+
+def seek_condition(ordering: List[Tuple[str, bool]], values: List[Any],
+                   forward: bool = True, inclusive: bool = False) -> Q:
+    """
+    Builds the seek condition for the rows after (or before) the row with the
+    given values in the given ordering, e.g. for the ordering (a, pk):
+    a > va OR (a = va AND pk > vpk)
+
+    :param ordering: list of tuples: result of 'get_ordering'
+    :param values: list: boundary values
+    :param forward: bool: seek the rows after the boundary, otherwise before
+    :param inclusive: bool: the boundary row itself is included
+    :return: Q object
+    """
+    condition = Q()
+    equal = {}
+    for (field_name, descending), value in zip(ordering, values):
+        lookup = "gt" if forward != descending else "lt"
+        condition |= Q(**equal, **{field_name + "__" + lookup: value})
+        equal[field_name] = value
+    if inclusive:
+        condition |= Q(**equal)
+    return condition
+
+
+def query_digest(*conditions: Any) -> str:
+    """
+    Short digest of the search conditions, which is used for making sure the
+    cursor belongs to the same query
+
+    :param conditions: search conditions
+    :return: str
+    """
+    return md5(repr(conditions).encode("utf-8")).hexdigest()[:12]
+
+
+def dump_cursor(start: int, items: list, ordering: List[Tuple[str, bool]],
+                digest: str) -> str:
+    """
+    Builds the signed cursor, which contains the boundary values of the given
+    page
+
+    :param start: int: position of the first row of the page
+    :param items: list: rows of the page
+    :param ordering: list of tuples: result of 'get_ordering'
+    :param digest: str: result of 'query_digest'
+    :return: str: cursor, or empty string if the page is empty
+    """
+    if not items:
+        return ""
+    cursor = {
+        "start": start, "size": len(items), "digest": digest,
+        "first": boundary_values(items[0], ordering),
+        "last": boundary_values(items[-1], ordering),
+    }
+    return signing.dumps(cursor, salt=CURSOR_SALT,
+                         serializer=CursorSerializer, compress=True)
+
+
+def load_cursor(token: str, digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Loads the cursor sent back by the frontend. The cursor is only usable if it
+    is valid, belongs to the same query and doesn't contain null values (nulls
+    can't be compared in the seek condition).
+
+    :param token: str: cursor returned by 'dump_cursor'
+    :param digest: str: result of 'query_digest'
+    :return: None/dict: cursor
+    """
+    if not token:
+        return None
+    try:
+        cursor = signing.loads(token, salt=CURSOR_SALT,
+                               serializer=CursorSerializer)
+    except signing.BadSignature:
+        return None
+    if cursor.get("digest") != digest:
+        return None
+    if None in cursor["first"] or None in cursor["last"]:
+        return None
+    return cursor
@@ -0,0 +1,129 @@
+"""
+Module to hold the functionality for compiling the frame and the mapping of a
+DataTables class into an immutable plan, which is shared by all its instances
+and read on every request instead of working it out again.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+from .search_types import SEARCH_TYPES, TEXT
+
+
+ColumnPlan = namedtuple("ColumnPlan", ["index", "searchable", "filter_func",
+                                       "filter_key", "order_asc", "order_desc",
+                                       "serializer_key", "search_type"])
+"""
+Compiled column of the mapping:
+* index: int: number of the column in frontend
+* searchable: bool: whether the column in frame is searchable
+* filter_func: None/str: queryset function used for filtering, e.g. 'filter',
+  None if the filter key in mapping is invalid
+* filter_key: None/str: keyword used in the filter function
+* order_asc: str: argument of queryset's order_by function, ascending
+* order_desc: str: argument of queryset's order_by function, descending
+* serializer_key: None/str: serializer key of the column in frame
+* search_type: str: how the search value is parsed, 'text' (default) passes
+  it as it is
+"""
+
+TablePlan = namedtuple("TablePlan", ["starter", "columns", "searchable",
+                                     "default_order", "serializer_keys"])
+"""
+Compiled plan of a DataTables class:
+* starter: int: first column number in mapping
+* columns: mapping proxy: column number -> ColumnPlan
+* searchable: frozenset of int: numbers of the searchable columns
+* default_order: ColumnPlan: column used for ordering by default
+* serializer_keys: tuple of str: serializer keys in frame
+"""
+
+
+def split_filter(filter_obj: Any) -> Tuple[Optional[str], Optional[str],
+                                           Optional[str]]:
+    """
+    Splits the filter of a mapping item, which can be defined as
+    (filter function, filter key, search type), (filter function, filter key)
+    or only the filter key (filter function 'filter')
+
+    :param filter_obj: filter in mapping
+    :return: tuple: (filter function, filter key, search type), None for the
+      missing parts
+    """
+    if type(filter_obj) is tuple and len(filter_obj) == 3:
+        return filter_obj
+    if type(filter_obj) is tuple and len(filter_obj) == 2:
+        return filter_obj + (None,)
+    if type(filter_obj) is str:
+        return "filter", filter_obj, None
+    return None, None, None
+
+
+def compile_column(enum_item: Any, frame: List[Dict[str, Any]]) -> ColumnPlan:
+    """
+    Compiles an item of the mapping together with the column in frame having
+    the same number. The search type is read from the column in frame
+    ('search_type'), or from the filter in mapping, which can be defined as
+    (filter function, filter key, search type).
+
+    :param enum_item: TripleEnum member: (column number, field name, filter)
+    :param frame: list of dict: frame defined in Meta class
+    :return: ColumnPlan
+    """
+    index = enum_item.key
+    item = {}
+    if isinstance(index, int) and 0 <= index < len(frame):
+        item = frame[index]
+    filter_func, filter_key, mapping_type = split_filter(enum_item.extra)
+    search_type = item.get("search_type") or mapping_type or TEXT
+    if search_type != TEXT and search_type not in SEARCH_TYPES:
+        raise ValueError("Search type of column %r must be one of %r."
+                         % (index, sorted(SEARCH_TYPES) + [TEXT]))
+    return ColumnPlan(index, bool(item.get("searchable", True)), filter_func,
+                      filter_key, enum_item.label, "-" + enum_item.label,
+                      item.get("serializer_key"), search_type)
+
+
+def build_plan(mapping, frame: List[Dict[str, Any]]) -> TablePlan:
+    """
+    Compiles the mapping and the frame into a TablePlan
+
+    :param mapping: TripleEnum class, with at least one member
+    :param frame: list of dict: frame defined in Meta class
+    :return: TablePlan
+    """
+    columns = {}
+    for enum_item in mapping:
+        # the first member wins, like in the mapping's 'from_key'
+        if enum_item.key not in columns:
+            columns[enum_item.key] = compile_column(enum_item, frame)
+    starter = mapping.keys()[0]
+    return TablePlan(
+        starter, MappingProxyType(columns),
+        frozenset(i for i, column in columns.items() if column.searchable),
+        columns[starter],
+        tuple(item["serializer_key"] for item in frame
+              if item.get("serializer_key")))
+
+
+@lru_cache(maxsize=None)
+def _cached_plan(mapping, frame: Tuple[Tuple[Tuple[str, Any], ...], ...]
+                 ) -> TablePlan:
+    return build_plan(mapping, [dict(item) for item in frame])
+
+
+def compile_plan(mapping, frame: List[Dict[str, Any]]) -> TablePlan:
+    """
+    Compiles the mapping and the frame into a TablePlan. It's cached per
+    mapping and frame, unless the frame contains unhashable values.
+
+    :param mapping: TripleEnum class, with at least one member
+    :param frame: list of dict: frame defined in Meta class
+    :return: TablePlan
+    """
+    try:
+        key = tuple(tuple(sorted(item.items())) for item in frame)
+        hash(key)
+    except TypeError:
+        return build_plan(mapping, frame)
+    return _cached_plan(mapping, key)
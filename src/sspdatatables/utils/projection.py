@@ -0,0 +1,159 @@
+"""
+Module to hold the functionality for the serializer-free projection: the
+dotted serializer keys in the frame are resolved into the lookups for the
+queryset's values function, and the rows fetched by it are converted into the
+same nested structure as the serializer would produce.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import RelatedField, ManyRelatedField
+from rest_framework.serializers import (
+    BaseSerializer, ListSerializer, SerializerMethodField
+)
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+ResolvedKey = namedtuple("ResolvedKey", ["keys", "source", "field",
+                                         "relations"])
+"""
+Result of resolving a serializer key:
+* keys: tuple of the keys in the serialized data up to the field
+* source: lookup of the field in the queryset's values function
+* field: serializer field, whose to_representation renders the value
+* relations: tuple of (keys, lookup) pairs of the nested serializers
+"""
+
+Projection = namedtuple("Projection", ["columns", "relations", "lookups"])
+"""
+Compiled projection of a frame:
+* columns: tuple of ResolvedKey
+* relations: tuple of (keys, lookup) pairs of all nested serializers
+* lookups: tuple of str, arguments of the queryset's values function
+"""
+
+
+def _follow(model, attrs: Iterable[str]) -> Optional[Tuple[Any, Any]]:
+    """
+    Follows the attributes through the model's fields
+
+    :param model: Django Model class: model to start with
+    :param attrs: list of str: attribute names
+    :return: None/tuple: the model and the field of the last attribute, None if
+      one of the attributes isn't a model field or is a to-many relation
+    """
+    field = None
+    for attr in attrs:
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if field.many_to_many or field.one_to_many:
+            return None
+        model = field.related_model if field.is_relation else None
+    return model, field
+
+
+def resolve_serializer_key(serializer_class,
+                           serializer_key: str) -> Optional[ResolvedKey]:
+    """
+    Resolves the dotted serializer key into the lookup of the model field,
+    e.g. 'author.nationality.name' is resolved into the lookup
+    'author__nationality' and the serializer field 'nationality' of the
+    nested AuthorSerializer, the rest 'name' is a key in its representation.
+
+    :param serializer_class: ModelSerializer class
+    :param serializer_key: str: dotted key defined in the frame
+    :return: None/ResolvedKey: None if the key can't be fetched by the values
+      function, e.g. SerializerMethodField, properties, to-many relations
+    """
+    serializer = serializer_class()
+    model = serializer_class.Meta.model
+    keys, lookup, relations = [], [], []
+    for part in serializer_key.split("."):
+        field = serializer.fields.get(part)
+        if field is None or isinstance(
+                field, (SerializerMethodField, ListSerializer,
+                        ManyRelatedField)) or not field.source_attrs:
+            return None
+        followed = _follow(model, field.source_attrs)
+        if followed is None:
+            return None
+        model, model_field = followed
+        keys.append(part)
+        lookup.extend(field.source_attrs)
+        if isinstance(field, BaseSerializer):
+            # nested serializer of a to-one relation
+            if not model_field.is_relation:
+                return None
+            relations.append((tuple(keys), "__".join(lookup)))
+            serializer = field
+            continue
+        if model_field.is_relation or isinstance(field, RelatedField):
+            return None
+        return ResolvedKey(tuple(keys), "__".join(lookup), field,
+                           tuple(relations))
+    # the key points to a whole nested serializer
+    return None
+
+
+@lru_cache(maxsize=None)
+def compile_projection(serializer_class,
+                       serializer_keys: Tuple[str, ...]) -> Optional[Projection]:
+    """
+    Compiles the projection for the serializer keys of a frame. It's cached
+    per serializer class and keys.
+
+    :param serializer_class: ModelSerializer class
+    :param serializer_keys: tuple of str: serializer keys of the columns
+    :return: None/Projection: None if one of the keys can't be projected
+    """
+    columns, relations, lookups = [], {}, []
+    for serializer_key in serializer_keys:
+        column = resolve_serializer_key(serializer_class, serializer_key)
+        if column is None:
+            return None
+        columns.append(column)
+        relations.update(column.relations)
+        lookups.append(column.source)
+    lookups.extend(relations.values())
+    # the inner relations come first, such that a missing outer record
+    # overrides them
+    relations = sorted(relations.items(), key=lambda x: -len(x[0]))
+    return Projection(tuple(columns), tuple(relations),
+                      tuple(dict.fromkeys(lookups)))
+
+
+def render_rows(rows: Iterable[Dict[str, Any]],
+                projection: Projection) -> List[Dict[str, Any]]:
+    """
+    Converts the rows fetched by the values function into the nested
+    structure of the serialized data. The values are rendered by the
+    serializer fields' to_representation, a nested serializer without related
+    record is rendered as None.
+
+    :param rows: list of dict: rows fetched by the values function
+    :param projection: Projection: result of 'compile_projection'
+    :return: list of dict
+    """
+    data = []
+    for row in rows:
+        item = {}
+        for column in projection.columns:
+            value = row[column.source]
+            if value is not None:
+                value = column.field.to_representation(value)
+            target = item
+            for key in column.keys[:-1]:
+                target = target.setdefault(key, {})
+            target[column.keys[-1]] = value
+        for keys, source in projection.relations:
+            if row[source] is None:
+                target = item
+                for key in keys[:-1]:
+                    target = target[key]
+                target[keys[-1]] = None
+        data.append(item)
+    return data
@@ -0,0 +1,245 @@
+"""
+Module to hold the functionality for planning the select_related,
+prefetch_related and only lookups of a DataTables class. The relations are
+worked out from the serializer fields and the field names and filter keys in
+the mapping, the loaded columns from the serializer fields.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import (
+    ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+)
+from rest_framework.serializers import (
+    BaseSerializer, ListSerializer, ModelSerializer, SerializerMethodField
+)
+from typing import Iterator, List, Optional, Tuple
+from .plan import split_filter
+
+
+RelatedPlan = namedtuple("RelatedPlan", ["select_related", "prefetch_related"])
+"""
+Lookups to join the related records:
+* select_related: tuple of str, forward foreign keys and one-to-one relations
+* prefetch_related: tuple of str, reverse foreign keys and many-to-many
+  relations
+"""
+
+
+def relation_path(model, lookup: str) -> Tuple[Optional[str], bool]:
+    """
+    Extracts the relations from a lookup, e.g. 'author__name__icontains' is
+    extracted to 'author'. The rest of the lookup after the last relation
+    (field names, transforms and lookups) is dropped.
+
+    :param model: Django Model class: model to start with
+    :param lookup: str: lookup of a field
+    :return: tuple: the lookup of the relations (None, if there is no
+      relation) and whether a to-many relation is in it
+    """
+    path, to_many = [], False
+    for part in lookup.split("__"):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        path.append(part)
+        to_many = to_many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return ("__".join(path) or None), to_many
+
+
+def related_models(model, lookups) -> Tuple[type, ...]:
+    """
+    Collects the models reached by the relations in the lookups, including
+    the given model
+
+    :param model: Django Model class: model to start with
+    :param lookups: iterable of str: lookups of fields
+    :return: tuple of Django Model classes
+    """
+    models = {model._meta.label_lower: model}
+    for lookup in lookups:
+        current = model
+        for part in lookup.split("__"):
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not field.is_relation or field.related_model is None:
+                break
+            current = field.related_model
+            models[current._meta.label_lower] = current
+    return tuple(models[label] for label in sorted(models))
+
+
+def serializer_lookups(serializer, prefix: str = "") -> Iterator[str]:
+    """
+    Generates the lookups of the serializer fields, which access related
+    records: nested serializers, related fields and dotted sources
+
+    :param serializer: ModelSerializer instance
+    :param prefix: str: lookup of the nested serializer
+    :return: generator of str
+    """
+    for field in serializer.fields.values():
+        if isinstance(field, SerializerMethodField) or field.source == "*":
+            continue
+        lookup = prefix + "__".join(field.source_attrs)
+        if isinstance(field, ListSerializer):
+            yield lookup
+            if isinstance(field.child, BaseSerializer):
+                yield from serializer_lookups(field.child, lookup + "__")
+        elif isinstance(field, BaseSerializer):
+            yield lookup
+            yield from serializer_lookups(field, lookup + "__")
+        elif isinstance(field, ManyRelatedField):
+            yield lookup
+        elif isinstance(field, RelatedField):
+            # the primary key of a foreign key is read without join
+            if not isinstance(field, PrimaryKeyRelatedField):
+                yield lookup
+        elif len(field.source_attrs) > 1:
+            yield lookup
+
+
+def _longest(lookups) -> Tuple[str, ...]:
+    """
+    Drops the lookups, which are covered by a longer one, e.g. 'author' is
+    covered by 'author__publisher'
+
+    :param lookups: iterable of str
+    :return: tuple of str
+    """
+    lookups = sorted(set(lookups))
+    return tuple(lookup for i, lookup in enumerate(lookups)
+                 if not any(other.startswith(lookup + "__")
+                            for other in lookups[i + 1:]))
+
+
+@lru_cache(maxsize=None)
+def plan_related(serializer_class, mapping) -> RelatedPlan:
+    """
+    Works out the select_related and prefetch_related lookups of a DataTables
+    class. The serializer fields (including the serializer keys in frame)
+    decide both; the field names and the filter keys in mapping only add
+    forward relations, since filtering and ordering don't need prefetching.
+    It's cached per serializer class and mapping.
+
+    :param serializer_class: ModelSerializer class
+    :param mapping: TripleEnum class
+    :return: RelatedPlan
+    """
+    model = serializer_class.Meta.model
+    select, prefetch = set(), set()
+    for lookup in serializer_lookups(serializer_class()):
+        path, to_many = relation_path(model, lookup)
+        if path:
+            (prefetch if to_many else select).add(path)
+
+    mapping_lookups = list(mapping.labels())
+    for extra in mapping.extras():
+        filter_key = split_filter(extra)[1]
+        if isinstance(filter_key, str):
+            mapping_lookups.append(filter_key)
+    for lookup in mapping_lookups:
+        path, to_many = relation_path(model, lookup)
+        if path and not to_many:
+            select.add(path)
+    return RelatedPlan(_longest(select), _longest(prefetch))
+
+
+def _serializer_columns(serializer, model, prefix: str,
+                        select_related: Tuple[str, ...]) -> Optional[List[str]]:
+    """
+    Collects the lookups of the model fields read by the serializer. The
+    fields of a related model are only collected, if the relation is joined
+    by select_related, otherwise only its foreign key is collected.
+
+    :param serializer: ModelSerializer instance
+    :param model: Django Model class: model of the serializer
+    :param prefix: str: lookup of the nested serializer
+    :param select_related: tuple of str: select_related lookups
+    :return: None/list of str: None if the serializer reads something, which
+      isn't a model field (methods, properties, customized representation)
+    """
+    if type(serializer).to_representation is not \
+            ModelSerializer.to_representation:
+        return None
+    columns = []
+    for field in serializer.fields.values():
+        if isinstance(field, SerializerMethodField):
+            return None
+        if field.source == "*":
+            if not isinstance(field, BaseSerializer):
+                return None
+            nested = _serializer_columns(field, model, prefix, select_related)
+            if nested is None:
+                return None
+            columns.extend(nested)
+            continue
+        current, path = model, []
+        for i, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            path.append(attr)
+            lookup = prefix + "__".join(path)
+            last = i == len(field.source_attrs) - 1
+            if not model_field.is_relation:
+                if not last:
+                    return None
+                columns.append(lookup)
+                break
+            if model_field.many_to_many or model_field.one_to_many:
+                # prefetched, the column isn't in this model's table
+                break
+            if model_field.related_model is None:
+                # generic relation
+                return None
+            if model_field.concrete:
+                columns.append(lookup)
+            current = model_field.related_model
+            if not any(lookup == joined or joined.startswith(lookup + "__")
+                       for joined in select_related):
+                # the related record is loaded lazily with all its fields
+                break
+            if not last:
+                continue
+            if isinstance(field, BaseSerializer):
+                nested = _serializer_columns(field, current, lookup + "__",
+                                             select_related)
+                if nested is None:
+                    return None
+                columns.extend(nested)
+            elif not isinstance(field, PrimaryKeyRelatedField):
+                # the related field may read any field of the related record
+                columns.extend(lookup + "__" + related_field.name
+                               for related_field
+                               in current._meta.concrete_fields)
+    return columns
+
+
+@lru_cache(maxsize=None)
+def plan_only(serializer_class,
+              select_related: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """
+    Works out the arguments of the queryset's only function from the fields
+    of the serializer, such that the columns not rendered by it (e.g. a big
+    text field) aren't loaded. The related models joined by select_related
+    are restricted as well. It's cached per serializer class and
+    select_related lookups.
+
+    :param serializer_class: ModelSerializer class
+    :param select_related: tuple of str: select_related lookups
+    :return: None/tuple of str: None if the columns can't be worked out
+    """
+    columns = _serializer_columns(serializer_class(),
+                                  serializer_class.Meta.model, "",
+                                  select_related)
+    if columns is None:
+        return None
+    return tuple(dict.fromkeys(columns))
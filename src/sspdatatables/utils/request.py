@@ -0,0 +1,214 @@
+"""
+Module to hold the functionality for parsing the parameters sent by data
+tables package into a typed request object in a single pass.
+"""
+import re
+from .data_type_ensure import ensure
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+COLUMN_PATTERN = re.compile(r"^columns\[(\d+)\]\[(\w+)\](?:\[(\w+)\])?$")
+ORDER_PATTERN = re.compile(r"^order\[(\d+)\]\[(\w+)\]$")
+
+
+class Column:
+    """
+    Parameters of a column: the data source, the searchable and orderable
+    flags and the search value
+    """
+    __slots__ = ("data", "searchable", "orderable", "search", "regex")
+
+    def __init__(self) -> None:
+        self.data = ""
+        self.searchable = False
+        self.orderable = False
+        self.search = ""
+        self.regex = False
+
+    def __repr__(self) -> str:
+        return "<Column: %r search=%r>" % (self.data, self.search)
+
+
+class Order:
+    """
+    Parameters of an ordering: the index of the column and the direction
+    """
+    __slots__ = ("column", "dir")
+
+    def __init__(self, column: Optional[int] = None, dir: str = "asc") -> None:
+        self.column = column
+        self.dir = dir
+
+    def __repr__(self) -> str:
+        return "<Order: %r %s>" % (self.column, self.dir)
+
+
+class DataTablesRequest:
+    """
+    Typed parameters sent by data tables package:
+    * draw: int: drawing number
+    * start: int: position of the first record of the page
+    * length: int: display length, -1 means all the records
+    * columns: dict: index of the column -> Column
+    * order: list of Order, in the order of 'order[i]'
+    * search: str: value of the global search
+    * search_regex: bool: whether the global search is a regular expression
+    * total_cols: None/int: number of the columns sent by the template
+    * extra: dict: all the other parameters, e.g. the keyset cursor
+    """
+    __slots__ = ("draw", "start", "length", "columns", "order", "search",
+                 "search_regex", "total_cols", "extra")
+
+    def __init__(self) -> None:
+        self.draw = 0
+        self.start = 0
+        self.length = 0
+        self.columns = {}
+        self.order = []
+        self.search = ""
+        self.search_regex = False
+        self.total_cols = None
+        self.extra = {}
+
+    def __repr__(self) -> str:
+        return "<DataTablesRequest: draw=%d start=%d length=%d>" % (
+            self.draw, self.start, self.length)
+
+
+def _items(query: Any) -> Iterable[Tuple[str, Any]]:
+    """
+    Iterates over the parameters with their first value. It supports
+    QueryDict, and dict with lists (**request.POST) or single values.
+
+    :param query: QueryDict/dict: parameters
+    :return: iterable of tuples: parameter's name and its first value
+    """
+    items = query.lists() if hasattr(query, "lists") else query.items()
+    for key, value in items:
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else ""
+        yield key, value
+
+
+def parse_request(query: Any) -> DataTablesRequest:
+    """
+    Parses the parameters sent by data tables package in a single pass
+
+    :param query: QueryDict/dict: parameters, e.g. request.POST
+    :return: DataTablesRequest
+    """
+    dt_request = DataTablesRequest()
+    columns = dt_request.columns
+    orders: Dict[int, Order] = {}
+    for key, value in _items(query):
+        if key.startswith("columns["):
+            match = COLUMN_PATTERN.match(key)
+            if match is None:
+                continue
+            index, name, sub_name = match.groups()
+            column = columns.get(int(index))
+            if column is None:
+                column = columns[int(index)] = Column()
+            if name == "search":
+                if sub_name == "value":
+                    column.search = value
+                elif sub_name == "regex":
+                    column.regex = value == "true"
+            elif name == "data":
+                column.data = value
+            elif name == "searchable":
+                column.searchable = value == "true"
+            elif name == "orderable":
+                column.orderable = value == "true"
+        elif key.startswith("order["):
+            match = ORDER_PATTERN.match(key)
+            if match is None:
+                continue
+            index, name = match.groups()
+            order = orders.get(int(index))
+            if order is None:
+                order = orders[int(index)] = Order()
+            if name == "column":
+                order.column = ensure(int, value)
+            elif name == "dir":
+                order.dir = "desc" if value == "desc" else "asc"
+        elif key == "draw":
+            dt_request.draw = ensure(int, value, 0)
+        elif key == "start":
+            dt_request.start = ensure(int, value, 0)
+        elif key == "length":
+            dt_request.length = ensure(int, value, 0)
+        elif key == "search[value]":
+            dt_request.search = value
+        elif key == "search[regex]":
+            dt_request.search_regex = value == "true"
+        elif key == "total_cols":
+            dt_request.total_cols = ensure(int, value)
+        else:
+            dt_request.extra[key] = value
+    dt_request.order = [orders[i] for i in sorted(orders)
+                        if orders[i].column is not None]
+    return dt_request
+
+
+IGNORED_PARAMETERS = frozenset({"draw", "_"})
+"""parameters not changing the result: the drawing number and jQuery's
+cache buster"""
+
+
+def normalize_request(dt_request: DataTablesRequest) -> tuple:
+    """
+    Converts the parsed parameters into a stable representation without the
+    drawing number, such that the same search on the same page gets the same
+    representation
+
+    :param dt_request: DataTablesRequest: parsed parameters
+    :return: tuple
+    """
+    columns = tuple((i, column.data, column.searchable, column.orderable,
+                     column.search, column.regex)
+                    for i, column in sorted(dt_request.columns.items()))
+    order = tuple((order.column, order.dir) for order in dt_request.order)
+    extra = tuple(sorted((key, value) for key, value in dt_request.extra.items()
+                         if key not in IGNORED_PARAMETERS))
+    return (dt_request.start, dt_request.length, columns, order,
+            dt_request.search, dt_request.search_regex, dt_request.total_cols,
+            extra)
+
+
+def without_column_search(dt_request: DataTablesRequest,
+                          index: int) -> DataTablesRequest:
+    """
+    Copies the parsed parameters without the search value of the given
+    column, e.g. for counting the alternatives to the column's search
+
+    :param dt_request: DataTablesRequest: parsed parameters
+    :param index: int: number of the column
+    :return: DataTablesRequest
+    """
+    copy = DataTablesRequest()
+    for name in DataTablesRequest.__slots__:
+        setattr(copy, name, getattr(dt_request, name))
+    copy.columns = dict(dt_request.columns)
+    column = copy.columns.get(index)
+    if column is not None:
+        copy.columns[index] = Column()
+        for name in Column.__slots__:
+            setattr(copy.columns[index], name, getattr(column, name))
+        copy.columns[index].search = ""
+    return copy
+
+
+def ensure_request(dt_request: Any = None,
+                   **kwargs: List[str]) -> DataTablesRequest:
+    """
+    Returns the given DataTablesRequest directly, otherwise parses the given
+    query dict or the keyword arguments (the old way: **request.POST)
+
+    :param dt_request: None/QueryDict/dict/DataTablesRequest: parameters
+    :param kwargs: dict: parameters, used if dt_request is None
+    :return: DataTablesRequest
+    """
+    if isinstance(dt_request, DataTablesRequest):
+        return dt_request
+    return parse_request(kwargs if dt_request is None else dt_request)
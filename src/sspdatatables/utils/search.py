@@ -0,0 +1,299 @@
+"""
+Module to hold the functionality for the global search of data tables package
+('search[value]'). The search value is split into tokens, each of them must
+match one of the search fields. It's compiled to the full-text search of the
+database, if it's available, such that an index can be used:
+* PostgreSQL: SearchVector/SearchQuery with prefix matching
+* SQLite: FTS5 shadow table, which is built by the management command
+  'build_search_index' and kept in sync by the signals post_save and
+  post_delete
+* otherwise: OR-chain of 'icontains' lookups
+"""
+import re
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save, post_delete
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+SEARCH_ANNOTATION = "dt_search"
+"""name of the alias holding the search vector on PostgreSQL"""
+
+MAX_TOKENS = 10
+"""maximal number of tokens taken from the search value"""
+
+FTS_CHUNK_SIZE = 2000
+"""number of records written into the FTS5 table at once"""
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+_ready_tables = set()
+"""(database alias, table name) of the existing FTS5 tables"""
+
+
+def search_tokens(search_value: str) -> List[str]:
+    """
+    Splits the search value into the tokens for the full-text search, the
+    characters other than letters, digits and underscore are dropped
+
+    :param search_value: str: value of the global search
+    :return: list of str
+    """
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(search_value)))[:MAX_TOKENS]
+
+
+def icontains_condition(fields: Iterable[str], search_value: str) -> Q:
+    """
+    Builds the fallback condition: each word of the search value must be
+    contained in one of the fields (case-insensitive)
+
+    :param fields: list of str: field lookups
+    :param search_value: str: value of the global search
+    :return: Q object
+    """
+    condition = Q()
+    for word in list(dict.fromkeys(search_value.split()))[:MAX_TOKENS]:
+        any_field = Q()
+        for field in fields:
+            any_field |= Q(**{field + "__icontains": word})
+        condition &= any_field
+    return condition
+
+
+def postgres_search(queryset, fields: Tuple[str, ...], tokens: List[str],
+                    config: Any = None):
+    """
+    Filters the queryset with PostgreSQL's full-text search, each token is
+    matched as prefix. A single field of type SearchVectorField is queried
+    directly, otherwise the search vector is built from the fields, which can
+    use an expression index with the same definition.
+
+    :param queryset: Django Queryset
+    :param fields: tuple of str: field lookups
+    :param tokens: list of str: result of 'search_tokens'
+    :param config: None/str: text search configuration
+    :return: queryset
+    """
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchVector, SearchVectorField
+    )
+    query = SearchQuery(" & ".join(token + ":*" for token in tokens),
+                        search_type="raw", config=config)
+    if len(fields) == 1 and "__" not in fields[0]:
+        field = queryset.model._meta.get_field(fields[0])
+        if isinstance(field, SearchVectorField):
+            return queryset.filter(**{fields[0]: query})
+    vector = SearchVector(*fields, config=config)
+    # an alias isn't selected, neither in the models nor in the values rows
+    return queryset.alias(**{SEARCH_ANNOTATION: vector}).filter(
+        **{SEARCH_ANNOTATION: query})
+
+
+def fts_query(tokens: List[str]) -> str:
+    """
+    Builds the FTS5 query, each token is quoted and matched as prefix
+
+    :param tokens: list of str: result of 'search_tokens'
+    :return: str
+    """
+    return " ".join('"%s"*' % token for token in tokens)
+
+
+def sqlite_search(queryset, table: str, tokens: List[str]):
+    """
+    Filters the queryset by the primary keys found in the FTS5 table
+
+    :param queryset: Django Queryset
+    :param table: str: name of the FTS5 table
+    :param tokens: list of str: result of 'search_tokens'
+    :return: queryset
+    """
+    matched = RawSQL('SELECT rowid FROM "%s" WHERE "%s" MATCH %%s'
+                     % (table, table), [fts_query(tokens)])
+    return queryset.filter(pk__in=matched)
+
+
+def _fts_exists(using: str, table: str) -> bool:
+    """
+    Checks if the FTS5 table exists in the database
+
+    :param using: str: database alias
+    :param table: str: name of the FTS5 table
+    :return: bool
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND "
+                       "name = %s", [table])
+        return cursor.fetchone() is not None
+
+
+def _fts_rows(model, fields: Tuple[str, ...], using: str,
+              pks: Any = None) -> Iterable[List[Any]]:
+    """
+    Generates the rows of the FTS5 table: the primary key followed by the text
+    of each field. The values of a to-many relation are joined.
+
+    :param model: Django Model class
+    :param fields: tuple of str: field lookups
+    :param using: str: database alias
+    :param pks: None/list: primary keys of the records, None for all
+    :return: generator of list
+    """
+    queryset = model._default_manager.using(using).order_by("pk")
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    row = None
+    for values in queryset.values_list("pk", *fields).iterator(
+            chunk_size=FTS_CHUNK_SIZE):
+        if row is not None and row[0] != values[0]:
+            yield [row[0]] + [" ".join(texts) for texts in row[1:]]
+            row = None
+        if row is None:
+            row = [values[0]] + [[] for _ in fields]
+        for texts, value in zip(row[1:], values[1:]):
+            if value is not None and str(value) not in texts:
+                texts.append(str(value))
+    if row is not None:
+        yield [row[0]] + [" ".join(texts) for texts in row[1:]]
+
+
+def _fts_insert(using: str, table: str, fields: Tuple[str, ...],
+                rows: Iterable[List[Any]]) -> None:
+    """
+    Writes the rows into the FTS5 table chunk by chunk
+
+    :param using: str: database alias
+    :param table: str: name of the FTS5 table
+    :param fields: tuple of str: field lookups
+    :param rows: iterable of list: result of '_fts_rows'
+    :return: None
+    """
+    sql = 'INSERT INTO "%s" (rowid, %s) VALUES (%s)' % (
+        table, ", ".join("c%d" % i for i in range(len(fields))),
+        ", ".join(["%s"] * (len(fields) + 1)))
+    with connections[using].cursor() as cursor:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= FTS_CHUNK_SIZE:
+                cursor.executemany(sql, chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(sql, chunk)
+
+
+def _fts_create(model, table: str, fields: Tuple[str, ...],
+                using: str) -> None:
+    """
+    Creates the FTS5 table and fills it with all the records
+
+    :param model: Django Model class
+    :param table: str: name of the FTS5 table
+    :param fields: tuple of str: field lookups
+    :param using: str: database alias
+    :return: None
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE VIRTUAL TABLE "%s" USING fts5(%s)' % (
+            table, ", ".join("c%d" % i for i in range(len(fields)))))
+    _fts_insert(using, table, fields, _fts_rows(model, fields, using))
+
+
+def ensure_fts_table(model, table: str, fields: Tuple[str, ...],
+                     using: str = "default") -> None:
+    """
+    Creates and fills the FTS5 table, if it doesn't exist yet. The check is
+    only done once per database alias and table.
+
+    :param model: Django Model class
+    :param table: str: name of the FTS5 table
+    :param fields: tuple of str: field lookups
+    :param using: str: database alias
+    :return: None
+    """
+    if (using, table) in _ready_tables:
+        return
+    try:
+        with transaction.atomic(using=using):
+            if not _fts_exists(using, table):
+                _fts_create(model, table, fields, using)
+    except DatabaseError:
+        # created by another process in the meantime
+        if not _fts_exists(using, table):
+            raise
+    _ready_tables.add((using, table))
+
+
+def rebuild_fts_table(model, table: str, fields: Tuple[str, ...],
+                      using: str = "default") -> None:
+    """
+    Drops and recreates the FTS5 table with all the records. It's needed after
+    changing the search fields, or after changes which don't send the signals
+    post_save and post_delete (queryset's 'update', 'bulk_create', raw sql,
+    changes of the related records).
+
+    :param model: Django Model class
+    :param table: str: name of the FTS5 table
+    :param fields: tuple of str: field lookups
+    :param using: str: database alias
+    :return: None
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "%s"' % table)
+        _fts_create(model, table, fields, using)
+    _ready_tables.add((using, table))
+
+
+def fts_ready(using: str, table: str) -> bool:
+    """
+    Checks if the FTS5 table exists on SQLite, such that it can be searched
+    and has to be kept in sync. It only reads from the database, a missing
+    table is created and filled with all the records by 'ensure_fts_table'
+    (management command 'build_search_index').
+
+    :param using: str: database alias
+    :param table: str: name of the FTS5 table
+    :return: bool
+    """
+    if (using, table) in _ready_tables:
+        return True
+    if connections[using].vendor != "sqlite" or \
+            not _fts_exists(using, table):
+        return False
+    _ready_tables.add((using, table))
+    return True
+
+
+def track_fts_table(model, table: str, fields: Tuple[str, ...]) -> None:
+    """
+    Connects the signals post_save and post_delete of the given model, such
+    that the FTS5 table is updated after each change of a record. It can be
+    called multiple times for the same table.
+
+    :param model: Django Model class
+    :param table: str: name of the FTS5 table
+    :param fields: tuple of str: field lookups
+    :return: None
+    """
+    def _delete(using: str, pk: Any) -> None:
+        with connections[using].cursor() as cursor:
+            cursor.execute('DELETE FROM "%s" WHERE rowid = %%s' % table, [pk])
+
+    def on_save(sender, instance, using: str = "default",
+                **kwargs: Dict[str, Any]) -> None:
+        if not fts_ready(using, table):
+            return
+        _delete(using, instance.pk)
+        _fts_insert(using, table, fields,
+                    _fts_rows(sender, fields, using, [instance.pk]))
+
+    def on_delete(sender, instance, using: str = "default",
+                  **kwargs: Dict[str, Any]) -> None:
+        if fts_ready(using, table):
+            _delete(using, instance.pk)
+
+    uid = "sspdatatables.search.%s" % table
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=uid)
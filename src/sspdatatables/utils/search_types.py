@@ -0,0 +1,140 @@
+"""
+Module to hold the functionality for compiling the search value of a typed
+column into lookups, which can use an index. The search value is parsed
+according to the column's search type with the syntax:
+* 'a..b': range, 'a..' and '..b' are open ranges (gte/lte)
+* 'a,b,c': one of the values (in)
+* otherwise: exact value
+"""
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from typing import Any, Callable, Dict
+
+
+class SearchValueError(ValueError):
+    """
+    The search value of a column doesn't match its search type
+    """
+
+
+def _parse_int(value: str) -> int:
+    return int(value)
+
+
+def _parse_float(value: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError("%r isn't a finite number." % value)
+    return number
+
+
+def _parse_decimal(value: str) -> Decimal:
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError("%r isn't a decimal number." % value)
+    if not number.is_finite():
+        raise ValueError("%r isn't a finite number." % value)
+    return number
+
+
+def _parse_date(value: str):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError("%r isn't a date." % value)
+    return date
+
+
+def _parse_datetime(value: str) -> datetime:
+    date_time = parse_datetime(value)
+    if date_time is None:
+        raise ValueError("%r isn't a datetime." % value)
+    if settings.USE_TZ and timezone.is_naive(date_time):
+        date_time = timezone.make_aware(date_time)
+    return date_time
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in {"true", "1", "yes"}:
+        return True
+    if lowered in {"false", "0", "no"}:
+        return False
+    raise ValueError("%r isn't a boolean." % value)
+
+
+SEARCH_TYPES = {
+    "str": str,
+    "int": _parse_int,
+    "float": _parse_float,
+    "decimal": _parse_decimal,
+    "date": _parse_date,
+    "datetime": _parse_datetime,
+    "bool": _parse_bool,
+}  # type: Dict[str, Callable[[str], Any]]
+"""parsers of the search types, the search type 'text' (default) passes the
+search value as it is"""
+
+TEXT = "text"
+
+RANGE_SEPARATOR = ".."
+IN_SEPARATOR = ","
+
+
+def _parse(parser: Callable[[str], Any], value: str) -> Any:
+    """
+    Parses a single value, the errors of the parser are converted into
+    SearchValueError
+
+    :param parser: function: one of SEARCH_TYPES
+    :param value: str: single value
+    :return: parsed value
+    """
+    value = value.strip()
+    if not value:
+        raise SearchValueError("Empty search value.")
+    try:
+        return parser(value)
+    except (TypeError, ValueError) as error:
+        raise SearchValueError("Invalid search value %r: %s" % (value, error))
+
+
+def compile_search(filter_key: str, search_type: str,
+                   search_value: str) -> Dict[str, Any]:
+    """
+    Compiles the search value of a column into the lookups, e.g. for the
+    search type 'date': '2020-01-01..2020-12-31' is compiled into
+    {'<filter_key>__range': (date(2020, 1, 1), date(2020, 12, 31))}
+
+    :param filter_key: str: filter key of the column in mapping, pointing to
+      the field
+    :param search_type: str: one of SEARCH_TYPES, or 'text'
+    :param search_value: str: search value of the column
+    :return: dict: lookups
+    """
+    if search_type == TEXT:
+        return {filter_key: search_value}
+    parser = SEARCH_TYPES[search_type]
+    if RANGE_SEPARATOR in search_value:
+        lower, upper = search_value.split(RANGE_SEPARATOR, 1)
+        lower, upper = lower.strip(), upper.strip()
+        if lower and upper:
+            return {filter_key + "__range": (_parse(parser, lower),
+                                             _parse(parser, upper))}
+        if lower:
+            return {filter_key + "__gte": _parse(parser, lower)}
+        if upper:
+            return {filter_key + "__lte": _parse(parser, upper)}
+        raise SearchValueError("Empty search range.")
+    if IN_SEPARATOR in search_value:
+        values = [_parse(parser, value)
+                  for value in search_value.split(IN_SEPARATOR)
+                  if value.strip()]
+        if not values:
+            raise SearchValueError("Empty search value.")
+        return {filter_key + "__in": list(dict.fromkeys(values))}
+    return {filter_key: _parse(parser, search_value)}
@@ -0,0 +1,107 @@
+"""
+Module to hold the functionality for coalescing identical concurrent calls in
+one process: the first call of a key computes the result, the calls of the
+same key arriving meanwhile wait for it and share it. It's thread-safe, e.g.
+for the threads of a WSGI worker. Each waiting call gets its own deep copy of
+the result, and its own copy of the error.
+"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SharedCallError(Exception):
+    """
+    Raised in the waiting calls, if the error of the shared call can't be
+    copied, the original error is its cause
+    """
+
+
+class Call:
+    """
+    Computation in flight: the waiting calls are woken up by the event, when
+    the result or the error is set
+    """
+    __slots__ = ("event", "result", "error", "waiting")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error: Any = None
+        self.waiting = 0
+
+
+def copy_error(error: BaseException) -> BaseException:
+    """
+    Copies the error of the shared call for a waiting call, such that each
+    thread raises its own exception with its own traceback. The copy has the
+    same type and arguments, but no traceback.
+
+    :param error: exception raised by the shared call
+    :return: exception
+    """
+    try:
+        return copy.copy(error)
+    except Exception:
+        return SharedCallError("The shared call failed: %r" % error)
+
+
+class SingleFlight:
+    """
+    Group of the computations in flight, one per key
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Call] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Calls the function, unless a call of the same key is in flight, then
+        it waits for that call and returns a deep copy of its result or raises
+        a copy of its error (caused by the original one). The first call
+        returns the result itself.
+
+        :param key: hashable: key of the computation
+        :param func: function without arguments computing the result
+        :return: tuple: the result and whether it's shared with another call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+            else:
+                call.waiting += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise copy_error(call.error) from call.error
+            # the kept result is never changed, it's only read by the copies
+            return copy.deepcopy(call.result), True
+        result = error = None
+        try:
+            result = func()
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            # the calls arriving from now on compute the result again
+            with self._lock:
+                del self._calls[key]
+            if call.waiting and error is not None:
+                call.error = error
+            elif call.waiting:
+                # the first call may change its result after returning it
+                try:
+                    call.result = copy.deepcopy(result)
+                except Exception as exc:
+                    call.error = exc
+            call.event.set()
+        return result, False
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+flights = SingleFlight()
+"""group shared by all the DataTables classes, the keys contain the class"""
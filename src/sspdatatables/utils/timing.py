@@ -0,0 +1,114 @@
+"""
+Module to hold the functionality for measuring the stages of a DataTables
+request: the duration and the number of SQL queries of each stage are
+collected, sent with the signal 'stage_timed' and rendered as the HTTP header
+'Server-Timing'.
+"""
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from django.db import connections
+from django.dispatch import Signal
+from typing import Any, Dict, Iterator, Optional
+
+
+stage_timed = Signal()
+"""
+Sent after each measured stage, e.g. for feeding a metrics system. The sender
+is the DataTables class, the arguments are:
+* stage: str: name of the stage
+* duration: float: duration in milliseconds
+* queries: None/int: number of SQL queries, None if they aren't counted
+* timing: Timing: all the stages measured so far
+"""
+
+
+class Timing:
+    """
+    Collects the duration in milliseconds and the number of SQL queries of
+    each stage, a repeated stage is added up
+    """
+    def __init__(self, sender: Any = None) -> None:
+        self.sender = sender
+        self.stages: Dict[str, Dict[str, Any]] = OrderedDict()
+
+    @contextmanager
+    def stage(self, name: str, count_queries: bool = True) -> Iterator[None]:
+        """
+        Measures the code inside the with statement as the given stage
+
+        :param name: str: name of the stage
+        :param count_queries: bool: count the SQL queries of all the database
+          connections of the current thread
+        :return: context manager
+        """
+        counter = [0]
+
+        def count(execute, sql, params, many, context):
+            counter[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                if count_queries:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(count))
+                yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000,
+                     counter[0] if count_queries else None)
+
+    def add(self, name: str, duration: float,
+            queries: Optional[int] = None) -> None:
+        """
+        Adds the measurement of a stage and sends the signal 'stage_timed'
+
+        :param name: str: name of the stage
+        :param duration: float: duration in milliseconds
+        :param queries: None/int: number of SQL queries
+        :return: None
+        """
+        stage = self.stages.setdefault(name, {"duration": 0.0,
+                                              "queries": None})
+        stage["duration"] += duration
+        if queries is not None:
+            stage["queries"] = (stage["queries"] or 0) + queries
+        stage_timed.send(sender=self.sender, stage=name, duration=duration,
+                         queries=queries, timing=self)
+
+    def header(self) -> str:
+        """
+        Renders the stages as value of the HTTP header 'Server-Timing', e.g.
+        'count;dur=1.234;desc="1 queries"'
+
+        :return: str
+        """
+        metrics = []
+        for name, stage in self.stages.items():
+            metric = "%s;dur=%.3f" % (name, stage["duration"])
+            if stage["queries"] is not None:
+                metric += ';desc="%d queries"' % stage["queries"]
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+
+class NoTiming:
+    """
+    Replaces Timing, if the timing is disabled, nothing is measured
+    """
+    stages = OrderedDict()
+
+    @contextmanager
+    def stage(self, name: str, count_queries: bool = True) -> Iterator[None]:
+        yield
+
+    def add(self, name: str, duration: float,
+            queries: Optional[int] = None) -> None:
+        pass
+
+    def header(self) -> str:
+        return ""
+
+
+NO_TIMING = NoTiming()